@@ -0,0 +1,160 @@
+"""
+Compiled LSB kernels for the steganography service
+
+The functions here are compiled with Numba when it is installed and fall
+back to equivalent NumPy fancy-indexing otherwise, so callers never need to
+check which implementation they got.
+
+Scatter indices are distinct (they come from a permutation), so no two
+iterations write the same sample and the index range can be split across
+threads without locking.
+
+The embed_groups/embed_run kernels read the payload as packed bytes. Group g
+is bits [g * lsb_bits, (g + 1) * lsb_bits) of the payload, MSB first and
+zero-padded past the end. The Numba kernels build each group on the fly; the
+NumPy fallbacks np.unpackbits the payload into uint8 bits and values.
+"""
+
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# Below this many indices the threading overhead outweighs the gain
+PARALLEL_MIN_INDICES = 1 << 18
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(parallel=True, boundscheck=False, cache=True)
+    def embed_groups(flat_audio, indices, groups, payload, lsb_bits, mask):
+        """Write payload group groups[i] into the low bits of flat_audio[indices[i]] in place"""
+        total_bits = payload.shape[0] * 8
+        for i in prange(indices.shape[0]):
+            start = groups[i] * lsb_bits
+            value = 0
+            for bit in range(start, start + lsb_bits):
+                value <<= 1
+                if bit < total_bits:
+                    value |= (payload[bit >> 3] >> (7 - (bit & 7))) & 1
+            sample_idx = indices[i]
+            flat_audio[sample_idx] = (flat_audio[sample_idx] & mask) | value
+            
+    @njit(parallel=True, boundscheck=False, cache=True)
+    def embed_run(flat_audio, offset, first_group, count, payload, lsb_bits, mask):
+        """Write payload groups first_group.. into flat_audio[offset:offset + count] in place"""
+        total_bits = payload.shape[0] * 8
+        for i in prange(count):
+            start = (first_group + i) * lsb_bits
+            value = 0
+            for bit in range(start, start + lsb_bits):
+                value <<= 1
+                if bit < total_bits:
+                    value |= (payload[bit >> 3] >> (7 - (bit & 7))) & 1
+            sample_idx = offset + i
+            flat_audio[sample_idx] = (flat_audio[sample_idx] & mask) | value
+            
+    @njit(parallel=True, boundscheck=False, cache=True)
+    def extract_scatter(flat_audio, indices, out, bit_mask):
+        """Store flat_audio[indices[i]] & bit_mask (the low LSB bits) in out[i]"""
+        for i in prange(indices.shape[0]):
+            out[i] = flat_audio[indices[i]] & bit_mask
+
+else:
+
+    _pool = None
+    _pool_lock = threading.Lock()
+
+    def _get_pool() -> ThreadPoolExecutor:
+        """Shared worker pool for the NumPy kernels, created on first use"""
+        global _pool
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1,
+                                           thread_name_prefix="stego")
+            return _pool
+
+    def _run_chunked(func, count, *arrays):
+        """
+        Call func on matching contiguous slices of arrays
+
+        NumPy releases the GIL inside fancy-index gathers and scatters on
+        plain integer dtypes, so the slices run in parallel.
+        """
+        workers = os.cpu_count() or 1
+        if count < PARALLEL_MIN_INDICES or workers == 1:
+            func(*arrays)
+            return
+
+        bounds = np.linspace(0, count, workers + 1).astype(np.intp)
+        futures = [
+            _get_pool().submit(func, *(array[start:stop] for array in arrays))
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        for future in futures:
+            future.result()
+
+    def extract_scatter(flat_audio, indices, out, bit_mask):
+        """Store flat_audio[indices[i]] & bit_mask (the low LSB bits) in out[i]"""
+        def extract_chunk(chunk_indices, chunk_out):
+            np.bitwise_and(flat_audio[chunk_indices], bit_mask, out=chunk_out, casting='unsafe')
+
+        _run_chunked(extract_chunk, len(indices), indices, out)
+
+    def _bits_to_values(bits, lsb_bits):
+        """Combine rows of lsb_bits 0/1 uint8 bits (MSB first) into uint8 values"""
+        bits = bits.reshape(-1, lsb_bits)
+        values = bits[:, 0].copy()
+        for column in range(1, lsb_bits):
+            values <<= 1
+            values |= bits[:, column]
+        return values
+
+    # Group values of the payload last passed to embed_groups, as
+    # (weakref to payload, lsb_bits, values). embed_message calls it once per
+    # progress chunk with the same payload array, so it is expanded only once.
+    _expanded = None
+    _expanded_lock = threading.Lock()
+
+    def _payload_values(payload, lsb_bits):
+        """Every lsb_bits-wide group of payload as a uint8 array (zero-padded at the end)"""
+        global _expanded
+        with _expanded_lock:
+            if _expanded is not None and _expanded[0]() is payload and _expanded[1] == lsb_bits:
+                return _expanded[2]
+
+            group_count = -(-payload.shape[0] * 8 // lsb_bits)
+            bits = np.unpackbits(payload, count=group_count * lsb_bits)
+            values = _bits_to_values(bits, lsb_bits)
+            _expanded = (weakref.ref(payload), lsb_bits, values)
+            return values
+
+    def embed_groups(flat_audio, indices, groups, payload, lsb_bits, mask):
+        """Write payload group groups[i] into the low bits of flat_audio[indices[i]] in place"""
+        values = _payload_values(payload, lsb_bits)
+
+        def embed_chunk(chunk_indices, chunk_groups):
+            flat_audio[chunk_indices] = (flat_audio[chunk_indices] & mask) | values[chunk_groups]
+
+        _run_chunked(embed_chunk, len(indices), indices, groups)
+
+    def embed_run(flat_audio, offset, first_group, count, payload, lsb_bits, mask):
+        """Write payload groups first_group.. into flat_audio[offset:offset + count] in place"""
+        # Unpack only the bytes these groups cover; count= zero-pads past the end
+        start_bit = first_group * lsb_bits
+        first_byte = start_bit >> 3
+        last_byte = -(-(start_bit + count * lsb_bits) // 8)
+        skip = start_bit - first_byte * 8
+        bits = np.unpackbits(payload[first_byte:last_byte], count=skip + count * lsb_bits)[skip:]
+        region = flat_audio[offset:offset + count]
+        region &= mask
+        region |= _bits_to_values(bits, lsb_bits)
@@ -5,8 +5,10 @@ Audio service for loading, converting, and playing audio files
 import numpy as np
 import wave
 import os
+import struct
 import tempfile
-from typing import Tuple, Optional
+import threading
+from typing import Iterable, Iterator, Tuple, Optional
 
 try:
     from pydub import AudioSegment
@@ -15,22 +17,153 @@ except ImportError:
     PYDUB_AVAILABLE = False
     print("Warning: pydub not available. Only WAV files will be supported.")
 
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+    # Compressed formats libsndfile can decode in-process (MP3 needs libsndfile >= 1.1)
+    SOUNDFILE_EXTENSIONS = {
+        '.' + fmt.lower() for fmt in sf.available_formats()
+    } & {'.flac', '.ogg', '.mp3'}
+except (ImportError, OSError):
+    SOUNDFILE_AVAILABLE = False
+    SOUNDFILE_EXTENSIONS = set()
+
+try:
+    import sounddevice as sd
+    SOUNDDEVICE_AVAILABLE = True
+except (ImportError, OSError):
+    SOUNDDEVICE_AVAILABLE = False
+
 try:
     import simpleaudio as sa
     SIMPLEAUDIO_AVAILABLE = True
 except ImportError:
     SIMPLEAUDIO_AVAILABLE = False
-    print("Warning: simpleaudio not available. Audio playback will be disabled.")
+    if not SOUNDDEVICE_AVAILABLE:
+        print("Warning: sounddevice/simpleaudio not available. Audio playback will be disabled.")
 
 from utils.errors import StegoError
 
 
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Frames per block yielded by iter_chunks
+STREAM_CHUNK_FRAMES = 16384
+
+# Playback gain is Q15 fixed point: 32768 is unity
+UNITY_GAIN_Q15 = 1 << 15
+
+
+def _gain_to_q15(gain: float) -> int:
+    """Clamp a 0.0-1.0 gain and convert it to Q15"""
+    return int(round(min(max(gain, 0.0), 1.0) * UNITY_GAIN_Q15))
+
+
+class _StreamPlayback:
+    """
+    Playback handle for a sounddevice output stream
+    
+    Mirrors the is_playing()/stop() interface of simpleaudio's PlayObject.
+    The Q15 gain is applied per block, so changing gain_q15 takes effect
+    on the next write. The stream is opened and started in the constructor,
+    so a missing device or unsupported rate raises there; a failure while
+    writing ends playback and is kept in error.
+    """
+    
+    write_frames = 4096  # Frames handed to PortAudio per write
+    stop_timeout = 1.0   # Seconds stop() waits for the writer thread
+    
+    def __init__(self, frames: np.ndarray, sample_rate: int, gain_q15: int = UNITY_GAIN_Q15):
+        self.frames = frames
+        self.gain_q15 = gain_q15
+        
+        # Scratch buffers for one scaled block, reused for every write
+        self._scaled = np.empty((self.write_frames, frames.shape[1]), dtype=np.int32)
+        self._block = np.empty((self.write_frames, frames.shape[1]), dtype=np.int16)
+        
+        self.error = None
+        
+        self.stream = sd.OutputStream(
+            samplerate=sample_rate,
+            channels=frames.shape[1],
+            dtype='int16',
+            blocksize=2048,
+            latency='high'
+        )
+        try:
+            self.stream.start()
+        except BaseException:
+            self.stream.close()
+            raise
+            
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        
+    def _run(self):
+        """Feed the stream; write() blocks inside PortAudio, not in Python"""
+        try:
+            for start in range(0, len(self.frames), self.write_frames):
+                if self._stop_event.is_set():
+                    self.stream.abort()
+                    break
+                self.stream.write(self._apply_gain(self.frames[start:start + self.write_frames]))
+            else:
+                self.stream.stop()
+        except Exception as e:
+            # Reported through error / AudioService.playback_error()
+            self.error = e
+        finally:
+            self.stream.close()
+            
+    def _apply_gain(self, block: np.ndarray) -> np.ndarray:
+        """Scale one block by the current gain, int16 -> int32 -> int16"""
+        gain_q15 = self.gain_q15
+        if gain_q15 == UNITY_GAIN_Q15:
+            return block
+            
+        scaled = self._scaled[:len(block)]
+        np.multiply(block, gain_q15, out=scaled, dtype=np.int32)
+        np.right_shift(scaled, 15, out=scaled)
+        
+        out = self._block[:len(block)]
+        np.copyto(out, scaled, casting='unsafe')
+        return out
+        
+    def is_playing(self) -> bool:
+        return self._thread.is_alive()
+        
+    def stop(self) -> None:
+        # The writer notices within one block, aborts and closes the stream
+        self._stop_event.set()
+        if threading.current_thread() is not self._thread:
+            self._thread.join(self.stop_timeout)
+
+
 class AudioService:
     """Service for handling audio operations"""
     
     def __init__(self):
         self.current_playback = None
+        self.gain_q15 = UNITY_GAIN_Q15
+        
+    def set_gain(self, gain: float) -> None:
+        """
+        Set the playback volume
         
+        Takes effect immediately on sounddevice streams; simpleaudio
+        buffers are scaled once, so its playback picks it up on the next start.
+        
+        Args:
+            gain: Volume level (0.0 to 1.0)
+        """
+        self.gain_q15 = _gain_to_q15(gain)
+        
+        playback = self.current_playback
+        if isinstance(playback, _StreamPlayback):
+            playback.gain_q15 = self.gain_q15
+            
     def load_audio(self, file_path: str) -> Tuple[np.ndarray, int]:
         """
         Load audio file and return PCM data and sample rate
@@ -40,7 +173,8 @@ class AudioService:
             
         Returns:
             Tuple of (audio_data, sample_rate)
-            audio_data is numpy array of int16 samples
+            audio_data is a writable numpy array of int16 samples that owns
+            its memory (use load_audio_mmap for a file-backed view)
         """
         if not os.path.exists(file_path):
             raise StegoError(f"Audio file not found: {file_path}")
@@ -50,14 +184,286 @@ class AudioService:
         if file_ext == '.wav':
             return self._load_wav(file_path)
         elif file_ext in ['.mp3', '.flac', '.m4a', '.ogg']:
+            if file_ext in SOUNDFILE_EXTENSIONS:
+                try:
+                    return self._load_with_soundfile(file_path)
+                except StegoError:
+                    if not PYDUB_AVAILABLE:
+                        raise
             if not PYDUB_AVAILABLE:
                 raise StegoError(f"pydub not available for {file_ext} format")
             return self._load_with_pydub(file_path)
         else:
             raise StegoError(f"Unsupported audio format: {file_ext}")
             
+    def load_audio_interleaved(self, file_path: str) -> Tuple[np.ndarray, int, int]:
+        """
+        Load audio file as a flat, interleaved sample array
+        
+        Same decoding as load_audio, but multi-channel audio stays 1-D with
+        the channel count returned separately. This is the layout the stego
+        routines, save_audio and playback work on, so no reshape/flatten
+        round trip is needed.
+        
+        Args:
+            file_path: Path to audio file
+            
+        Returns:
+            Tuple of (samples, sample_rate, channels)
+        """
+        audio_data, sample_rate = self.load_audio(file_path)
+        
+        if audio_data.ndim == 1:
+            return audio_data, sample_rate, 1
+            
+        # C-contiguous (frames, channels) -> 1-D view, no copy
+        return audio_data.reshape(-1), sample_rate, audio_data.shape[1]
+        
+    def iter_chunks(self, file_path: str, 
+                    chunk_frames: int = STREAM_CHUNK_FRAMES) -> Iterator[np.ndarray]:
+        """
+        Yield the samples of an audio file as interleaved int16 blocks
+        
+        PCM WAV data is read straight from the file and other formats go
+        through soundfile's block reader when available, so only one block
+        is resident at a time. Anything else is decoded in full and sliced.
+        
+        Args:
+            file_path: Path to audio file
+            chunk_frames: Frames per block
+            
+        Returns:
+            Iterator of fresh, writable 1-D int16 arrays of at most
+            chunk_frames frames each, in file order
+        """
+        if not os.path.exists(file_path):
+            raise StegoError(f"Audio file not found: {file_path}")
+            
+        file_ext = os.path.splitext(file_path)[1].lower()
+        
+        layout = None
+        if file_ext == '.wav':
+            try:
+                layout = self._parse_wav_layout(file_path)
+            except (OSError, ValueError, struct.error):
+                layout = None
+                
+        try:
+            if layout is not None:
+                yield from self._iter_wav_chunks(file_path, layout, chunk_frames)
+            elif file_ext in SOUNDFILE_EXTENSIONS:
+                for block in sf.blocks(file_path, blocksize=chunk_frames, dtype='int16',
+                                       always_2d=True):
+                    yield block.reshape(-1)
+            else:
+                audio_data, _, channels = self.load_audio_interleaved(file_path)
+                step = chunk_frames * channels
+                for start in range(0, len(audio_data), step):
+                    yield audio_data[start:start + step].copy()
+                    
+        except StegoError:
+            raise
+        except Exception as e:
+            raise StegoError(f"Failed to read audio file: {str(e)}")
+            
+    def _iter_wav_chunks(self, file_path: str, layout: dict,
+                         chunk_frames: int) -> Iterator[np.ndarray]:
+        """Read a PCM WAV data chunk block by block, converting each to int16"""
+        num_channels = layout['channels']
+        sample_width = layout['sample_width']
+        dtype = self._wav_dtype(sample_width)
+        
+        remaining = (layout['data_size'] // (sample_width * num_channels)) * num_channels
+        step = chunk_frames * num_channels
+        
+        with open(file_path, 'rb') as f:
+            f.seek(layout['data_offset'])
+            while remaining > 0:
+                block = np.empty(min(step, remaining), dtype=dtype)
+                if f.readinto(memoryview(block).cast('B')) != block.nbytes:
+                    raise StegoError("WAV data chunk is truncated")
+                remaining -= len(block)
+                yield self._to_int16(block, 1)
+                
     def _load_wav(self, file_path: str) -> Tuple[np.ndarray, int]:
-        """Load WAV file directly"""
+        """
+        Load WAV file directly
+        
+        The PCM data chunk is read straight into a writable array in a single
+        copy, with no intermediate bytes object. The array owns its memory, so
+        no file handle outlives the call and the source can be overwritten
+        while the samples are still in use. Files with a chunk layout the
+        RIFF scanner doesn't understand go through the wave module instead.
+        """
+        try:
+            layout = self._parse_wav_layout(file_path)
+        except (OSError, ValueError, struct.error):
+            layout = None
+            
+        if layout is None:
+            return self._load_wav_with_wave(file_path)
+            
+        try:
+            num_channels = layout['channels']
+            sample_width = layout['sample_width']
+            num_samples = (layout['data_size'] // (sample_width * num_channels)) * num_channels
+            
+            dtype = self._wav_dtype(sample_width)
+            
+            audio_data = np.empty(num_samples, dtype=dtype)
+            with open(file_path, 'rb') as f:
+                f.seek(layout['data_offset'])
+                f.readinto(memoryview(audio_data).cast('B'))
+                
+            return self._to_int16(audio_data, num_channels), layout['sample_rate']
+            
+        except StegoError:
+            raise
+        except Exception as e:
+            raise StegoError(f"Failed to load WAV file: {str(e)}")
+            
+    def load_audio_mmap(self, file_path: str, mode: str = 'c') -> Tuple[np.memmap, int, dict]:
+        """
+        Memory-map the samples of a 16-bit PCM WAV file
+        
+        Unlike load_audio, nothing is read up front: the OS pages in only the
+        parts of the file that are touched, which suits LSB encoders that
+        rewrite a sparse set of samples in place.
+        
+        The returned array holds the mapping, and with it an open handle on
+        the file, for as long as it (or any view of it) is alive. Release it
+        before the source path is replaced or deleted: on Windows a mapped
+        file cannot be overwritten, so os.replace onto it fails.
+        
+        Args:
+            file_path: Path to WAV file
+            mode: np.memmap mode - 'r' read-only, 'c' copy-on-write (writable,
+                  file untouched) or 'r+' (writes go to the file)
+            
+        Returns:
+            Tuple of (audio_data, sample_rate, header_meta)
+            audio_data has the same shape contract as load_audio;
+            header_meta holds channels, sample_width, frames and data_offset
+        """
+        if not os.path.exists(file_path):
+            raise StegoError(f"Audio file not found: {file_path}")
+            
+        try:
+            layout = self._parse_wav_layout(file_path)
+        except (OSError, ValueError, struct.error) as e:
+            raise StegoError(f"Failed to parse WAV header: {str(e)}")
+            
+        if layout is None or layout['sample_width'] != 2:
+            raise StegoError("Memory-mapped access requires a 16-bit PCM WAV file")
+            
+        num_channels = layout['channels']
+        num_frames = layout['data_size'] // (2 * num_channels)
+        
+        if num_frames == 0:
+            raise StegoError("WAV file contains no audio frames")
+            
+        try:
+            audio_data = np.memmap(
+                file_path,
+                dtype='<i2',
+                mode=mode,
+                offset=layout['data_offset'],
+                shape=(num_frames * num_channels,)
+            )
+        except Exception as e:
+            raise StegoError(f"Failed to memory-map WAV file: {str(e)}")
+            
+        if num_channels > 1:
+            audio_data = audio_data.reshape(-1, num_channels)
+            
+        header_meta = {
+            'channels': num_channels,
+            'sample_width': 2,
+            'frames': num_frames,
+            'data_offset': layout['data_offset']
+        }
+        
+        return audio_data, layout['sample_rate'], header_meta
+        
+    def _parse_wav_layout(self, file_path: str) -> Optional[dict]:
+        """
+        Walk the RIFF chunks of a WAV file to locate the PCM data
+        
+        Returns:
+            Dictionary with format parameters and the data chunk offset/size,
+            or None if the file isn't plain integer PCM
+        """
+        file_size = os.path.getsize(file_path)
+        
+        with open(file_path, 'rb') as f:
+            riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+            if riff != b'RIFF' or wave_id != b'WAVE':
+                return None
+                
+            fmt = None
+            while True:
+                chunk_header = f.read(8)
+                if len(chunk_header) < 8:
+                    return None
+                chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+                
+                if chunk_id == b'fmt ':
+                    fmt_data = f.read(chunk_size)
+                    format_tag, channels, sample_rate, _, _, bits = struct.unpack(
+                        '<HHIIHH', fmt_data[:16]
+                    )
+                    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt_data) >= 26:
+                        format_tag = struct.unpack('<H', fmt_data[24:26])[0]
+                    if format_tag != WAVE_FORMAT_PCM or channels < 1 or bits % 8:
+                        return None
+                    fmt = {
+                        'channels': channels,
+                        'sample_rate': sample_rate,
+                        'sample_width': bits // 8
+                    }
+                    if chunk_size % 2:
+                        f.seek(1, os.SEEK_CUR)
+                        
+                elif chunk_id == b'data':
+                    if fmt is None:
+                        return None
+                    data_offset = f.tell()
+                    # Streaming writers may leave a placeholder size behind
+                    fmt['data_offset'] = data_offset
+                    fmt['data_size'] = min(chunk_size, file_size - data_offset)
+                    return fmt
+                    
+                else:
+                    f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+                    
+    def _wav_dtype(self, sample_width: int):
+        """NumPy dtype for a WAV sample width in bytes (WAV PCM is little-endian)"""
+        if sample_width == 1:
+            return np.dtype('<u1')
+        elif sample_width == 2:
+            return np.dtype('<i2')
+        elif sample_width == 4:
+            return np.dtype('<i4')
+        else:
+            raise StegoError(f"Unsupported sample width: {sample_width}")
+            
+    def _to_int16(self, audio_data: np.ndarray, num_channels: int) -> np.ndarray:
+        """Reshape interleaved samples per channel and convert them to int16"""
+        # Reshape for multi-channel audio
+        if num_channels > 1:
+            audio_data = audio_data.reshape(-1, num_channels)
+            
+        # Convert to int16 if needed (integer shifts, no float temporaries)
+        if audio_data.dtype.itemsize == 1:
+            audio_data = (audio_data.astype(np.int16) - 128) << 8
+        elif audio_data.dtype.itemsize == 4:
+            audio_data = (audio_data >> 16).astype(np.int16)
+            
+        # Native byte order: a no-op on little-endian hosts, a byteswap otherwise
+        return audio_data.astype('=i2', copy=False)
+        
+    def _load_wav_with_wave(self, file_path: str) -> Tuple[np.ndarray, int]:
+        """Load WAV file through the wave module"""
         try:
             with wave.open(file_path, 'rb') as wav_file:
                 # Get parameters
@@ -70,38 +476,27 @@ class AudioService:
                 raw_audio = wav_file.readframes(num_frames)
                 
                 # Convert to numpy array
-                if sample_width == 1:
-                    dtype = np.uint8
-                elif sample_width == 2:
-                    dtype = np.int16
-                elif sample_width == 4:
-                    dtype = np.int32
-                else:
-                    raise StegoError(f"Unsupported sample width: {sample_width}")
-                    
+                dtype = self._wav_dtype(sample_width)
                 audio_data = np.frombuffer(raw_audio, dtype=dtype)
                 
-                # Reshape for multi-channel audio
-                if num_channels > 1:
-                    audio_data = audio_data.reshape(-1, num_channels)
-                    
-                # Convert to int16 if needed
-                if dtype != np.int16:
-                    if dtype == np.uint8:
-                        audio_data = ((audio_data.astype(np.float32) - 128) * 256).astype(np.int16)
-                    elif dtype == np.int32:
-                        audio_data = (audio_data / 65536).astype(np.int16)
-                        
-                return audio_data, sample_rate
+                return self._to_int16(audio_data, num_channels), sample_rate
                 
         except Exception as e:
             raise StegoError(f"Failed to load WAV file: {str(e)}")
             
+    def _load_with_soundfile(self, file_path: str) -> Tuple[np.ndarray, int]:
+        """Decode audio file in-process with libsndfile (no ffmpeg subprocess)"""
+        try:
+            audio_data, sample_rate = sf.read(file_path, dtype='int16', always_2d=False)
+            return audio_data, sample_rate
+            
+        except Exception as e:
+            raise StegoError(f"Failed to load audio file with soundfile: {str(e)}")
+            
     def _load_with_pydub(self, file_path: str) -> Tuple[np.ndarray, int]:
         """Load audio file using pydub and convert to WAV"""
         try:
             # Load with pydub
-            from pydub import AudioSegment
             audio_segment = AudioSegment.from_file(file_path)
             
             # Convert to 16-bit PCM WAV format
@@ -112,7 +507,7 @@ class AudioService:
             
             # Convert to numpy array
             raw_data = audio_segment.raw_data
-            audio_data = np.frombuffer(raw_data, dtype=np.int16)
+            audio_data = np.frombuffer(raw_data, dtype='<i2').astype('=i2', copy=False)
             
             # Reshape for stereo
             if audio_segment.channels > 1:
@@ -123,7 +518,8 @@ class AudioService:
         except Exception as e:
             raise StegoError(f"Failed to load audio file with pydub: {str(e)}")
             
-    def save_audio(self, audio_data: np.ndarray, sample_rate: int, output_path: str) -> None:
+    def save_audio(self, audio_data: np.ndarray, sample_rate: int, output_path: str,
+                   channels: Optional[int] = None) -> None:
         """
         Save audio data as WAV file
         
@@ -131,6 +527,8 @@ class AudioService:
             audio_data: Audio samples as numpy array
             sample_rate: Sample rate in Hz
             output_path: Output file path
+            channels: Channel count when audio_data is 1-D interleaved
+                      (as returned by load_audio_interleaved)
         """
         try:
             # Ensure audio data is int16
@@ -139,22 +537,72 @@ class AudioService:
                 
             # Determine number of channels
             if len(audio_data.shape) == 1:
-                num_channels = 1
-                frames = audio_data
+                num_channels = channels or 1
             else:
                 num_channels = audio_data.shape[1]
-                frames = audio_data.flatten()
                 
-            # Write WAV file
-            with wave.open(output_path, 'wb') as wav_file:
-                wav_file.setnchannels(num_channels)
-                wav_file.setsampwidth(2)  # 16-bit
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(frames.tobytes())
+            # C-contiguous little-endian (frames, channels) data is already
+            # in WAV layout, so it can be handed to the writer without a copy
+            frames = np.ascontiguousarray(audio_data, dtype='<i2')
+                
+            # Write to a temporary file and swap it into place, so a crash
+            # mid-write can't leave a truncated output and an input that is
+            # also the output isn't clobbered before it is fully read. Arrays
+            # from load_audio_mmap must be released first: a mapped file
+            # can't be replaced on Windows.
+            temp_path = f"{output_path}.{os.getpid()}.tmp"
+            
+            try:
+                with wave.open(temp_path, 'wb') as wav_file:
+                    wav_file.setnchannels(num_channels)
+                    wav_file.setsampwidth(2)  # 16-bit
+                    wav_file.setframerate(sample_rate)
+                    wav_file.writeframes(memoryview(frames).cast('B'))
+                os.replace(temp_path, output_path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
                 
         except Exception as e:
             raise StegoError(f"Failed to save audio file: {str(e)}")
             
+    def save_audio_stream(self, chunks: Iterable[np.ndarray], sample_rate: int,
+                          output_path: str, channels: int) -> None:
+        """
+        Save interleaved int16 blocks as a WAV file as they arrive
+        
+        Args:
+            chunks: Iterable of 1-D interleaved sample blocks (e.g. from
+                    iter_chunks), each a whole number of frames
+            sample_rate: Sample rate in Hz
+            output_path: Output file path
+            channels: Channel count
+        """
+        try:
+            # Same temporary-file swap as save_audio; the input may still be
+            # read while the output is written when both paths are the same
+            temp_path = f"{output_path}.{os.getpid()}.tmp"
+            
+            try:
+                with wave.open(temp_path, 'wb') as wav_file:
+                    wav_file.setnchannels(channels)
+                    wav_file.setsampwidth(2)  # 16-bit
+                    wav_file.setframerate(sample_rate)
+                    for chunk in chunks:
+                        frames = np.ascontiguousarray(chunk, dtype='<i2')
+                        wav_file.writeframesraw(memoryview(frames).cast('B'))
+                os.replace(temp_path, output_path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+                
+        except StegoError:
+            raise
+        except Exception as e:
+            raise StegoError(f"Failed to save audio file: {str(e)}")
+            
     def get_audio_info(self, file_path: str) -> dict:
         """
         Get information about audio file
@@ -166,15 +614,21 @@ class AudioService:
             Dictionary with audio information
         """
         try:
-            audio_data, sample_rate = self.load_audio(file_path)
+            header_info = self._read_header_info(file_path)
             
-            if len(audio_data.shape) == 1:
-                num_channels = 1
-                num_frames = len(audio_data)
+            if header_info is not None:
+                sample_rate, num_channels, num_frames = header_info
             else:
-                num_channels = audio_data.shape[1]
-                num_frames = audio_data.shape[0]
+                # Container without usable header metadata: decode it
+                audio_data, sample_rate = self.load_audio(file_path)
                 
+                if len(audio_data.shape) == 1:
+                    num_channels = 1
+                    num_frames = len(audio_data)
+                else:
+                    num_channels = audio_data.shape[1]
+                    num_frames = audio_data.shape[0]
+                    
             duration = num_frames / sample_rate
             
             return {
@@ -188,48 +642,115 @@ class AudioService:
         except Exception as e:
             raise StegoError(f"Failed to get audio info: {str(e)}")
             
-    def start_playback(self, audio_data: np.ndarray, sample_rate: int, volume: float = 1.0) -> None:
+    def _read_header_info(self, file_path: str) -> Optional[Tuple[int, int, int]]:
+        """
+        Read (sample_rate, channels, frames) from the file header without
+        decoding any samples
+        
+        Returns:
+            The header values, or None if they can't be read without a decode
+        """
+        if not os.path.exists(file_path):
+            raise StegoError(f"Audio file not found: {file_path}")
+            
+        file_ext = os.path.splitext(file_path)[1].lower()
+        
+        if file_ext == '.wav':
+            try:
+                layout = self._parse_wav_layout(file_path)
+            except (OSError, ValueError, struct.error):
+                layout = None
+                
+            if layout is not None:
+                frame_size = layout['sample_width'] * layout['channels']
+                return layout['sample_rate'], layout['channels'], layout['data_size'] // frame_size
+                
+            with wave.open(file_path, 'rb') as wav_file:
+                return wav_file.getframerate(), wav_file.getnchannels(), wav_file.getnframes()
+                
+        if file_ext in SOUNDFILE_EXTENSIONS:
+            try:
+                info = sf.info(file_path)
+                if info.frames > 0:
+                    return info.samplerate, info.channels, info.frames
+            except Exception:
+                pass
+                
+        return None
+            
+    def start_playback(self, audio_data: np.ndarray, sample_rate: int, 
+                       volume: Optional[float] = None, channels: Optional[int] = None) -> None:
         """
         Start audio playback
         
         Args:
             audio_data: Audio samples
             sample_rate: Sample rate
-            volume: Volume level (0.0 to 1.0)
+            volume: Volume level (0.0 to 1.0); defaults to the set_gain value
+            channels: Channel count when audio_data is 1-D interleaved
         """
-        if not SIMPLEAUDIO_AVAILABLE:
-            raise StegoError("Audio playback not available (simpleaudio not installed)")
+        if not (SOUNDDEVICE_AVAILABLE or SIMPLEAUDIO_AVAILABLE):
+            raise StegoError("Audio playback not available (sounddevice/simpleaudio not installed)")
             
         try:
             # Stop any current playback
             self.stop_playback()
             
-            # Apply volume
-            if volume != 1.0:
-                audio_data = (audio_data * volume).astype(np.int16)
+            # Per-channel view of interleaved samples (no copy)
+            if channels and channels > 1 and audio_data.ndim == 1:
+                audio_data = audio_data.reshape(-1, channels)
+            
+            if volume is not None:
+                self.set_gain(volume)
                 
-            # Ensure correct format for playback
-            if len(audio_data.shape) == 1:
-                # Mono audio
-                num_channels = 1
-                playback_data = audio_data
-            else:
-                # Multi-channel audio
-                num_channels = audio_data.shape[1]
-                playback_data = audio_data.flatten()
+            playback = None
+            if SOUNDDEVICE_AVAILABLE:
+                # PortAudio reads (frames, channels) int16 views directly;
+                # the stream applies the gain block by block
+                frames = np.ascontiguousarray(audio_data)
+                if frames.ndim == 1:
+                    frames = frames.reshape(-1, 1)
+                try:
+                    playback = _StreamPlayback(frames, sample_rate, self.gain_q15)
+                except Exception:
+                    # No usable output device or unsupported rate; simpleaudio
+                    # goes through its own backend and may still work
+                    if not SIMPLEAUDIO_AVAILABLE:
+                        raise
+                        
+            if playback is None:
+                # Apply volume as a Q15 fixed-point gain so the math stays in
+                # integers instead of promoting the whole buffer to float64
+                if self.gain_q15 != UNITY_GAIN_Q15:
+                    audio_data = ((audio_data.astype(np.int32) * self.gain_q15) >> 15).astype(np.int16)
+
+                playback = self._play_with_simpleaudio(audio_data, sample_rate)
                 
-            # Start playback
-            import simpleaudio as sa
-            self.current_playback = sa.play_buffer(
-                playback_data.tobytes(),
-                num_channels=num_channels,
-                bytes_per_sample=2,
-                sample_rate=sample_rate
-            )
+            self.current_playback = playback
             
         except Exception as e:
             raise StegoError(f"Failed to start playback: {str(e)}")
             
+    def _play_with_simpleaudio(self, audio_data: np.ndarray, sample_rate: int):
+        """Start playback through simpleaudio (copies the whole buffer)"""
+        # Ensure correct format for playback
+        if len(audio_data.shape) == 1:
+            # Mono audio
+            num_channels = 1
+            playback_data = audio_data
+        else:
+            # Multi-channel audio
+            num_channels = audio_data.shape[1]
+            playback_data = audio_data.flatten()
+            
+        # Start playback
+        return sa.play_buffer(
+            playback_data.tobytes(),
+            num_channels=num_channels,
+            bytes_per_sample=2,
+            sample_rate=sample_rate
+        )
+            
     def stop_playback(self) -> None:
         """Stop current audio playback"""
         try:
@@ -248,6 +769,15 @@ class AudioService:
         except:
             return False
             
+    def playback_error(self) -> Optional[Exception]:
+        """
+        Exception that ended the current sounddevice playback early, if any
+        
+        Returns:
+            The exception raised while writing to the stream, or None
+        """
+        return getattr(self.current_playback, 'error', None)
+            
     def convert_to_wav(self, input_path: str, output_path: str) -> None:
         """
         Convert audio file to WAV format
@@ -4,49 +4,169 @@ Cryptographic service for encrypting and decrypting messages
 
 import os
 import hashlib
-from typing import Tuple
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple, Union
 
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDFExpand
 from cryptography.exceptions import InvalidTag
 
 from utils.errors import StegoError
 
 
+# Character class bits used by verify_password_strength
+_UPPER, _LOWER, _DIGIT, _SPECIAL = 1, 2, 4, 8
+_SPECIAL_CHARS = frozenset("!@#$%^&*()_+-=[]{}|;:,.<>?")
+
+# Byte -> class mask lookup table for single-pass classification of ASCII passwords
+_CHAR_CLASS = bytes(
+    (_UPPER if chr(b).isupper() else 0) |
+    (_LOWER if chr(b).islower() else 0) |
+    (_DIGIT if chr(b).isdigit() else 0) |
+    (_SPECIAL if chr(b) in _SPECIAL_CHARS else 0)
+    if b < 128 else 0
+    for b in range(256)
+)
+
+
 class CryptoService:
     """Service for cryptographic operations"""
     
-    def __init__(self):
-        self.key_iterations = 200000  # PBKDF2 iterations
+    SUPPORTED_KDFS = ('pbkdf2', 'scrypt')
+    
+    # PBKDF2 calibration: time a short run once per process and scale it to
+    # the target latency, within fixed security bounds
+    PBKDF2_TARGET_MS = 100
+    PBKDF2_CALIBRATION_ITERATIONS = 10000
+    PBKDF2_MIN_ITERATIONS = 100000
+    PBKDF2_MAX_ITERATIONS = 2000000
+    _calibrated_iterations = None
+    _calibration_lock = threading.Lock()
+    
+    def __init__(self, kdf: str = 'pbkdf2'):
+        if kdf not in self.SUPPORTED_KDFS:
+            raise StegoError(f"Unsupported key derivation function: {kdf}")
+            
+        self.kdf = kdf
+        self.key_iterations = self.calibrate_iterations()  # PBKDF2 iterations
         self.key_length = 32  # 256-bit AES key
         self.salt_length = 16  # 128-bit salt
         self.nonce_length = 12  # 96-bit nonce for GCM
         
-    def encrypt_message(self, message: str, password: str) -> Tuple[bytes, bytes, bytes]:
+        # scrypt cost parameters (~16 MiB of memory per derivation)
+        self.scrypt_n = 2 ** 14
+        self.scrypt_r = 8
+        self.scrypt_p = 1
+        
+        # Small LRU of derived keys so repeated operations with the same
+        # credentials skip the KDF. Passwords are only kept as a hash.
+        self.key_cache_size = 8
+        self._key_cache = OrderedDict()
+        self._key_cache_lock = threading.Lock()
+        
+        # AESGCM instances for recently derived keys, so the OpenSSL cipher
+        # context is set up once per key rather than once per message
+        self._cipher_cache = OrderedDict()
+        
+        # Background worker for the *_async methods. hashlib's PBKDF2 and
+        # the AEAD calls release the GIL, so work submitted here runs in
+        # parallel with the calling thread.
+        self._crypto_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crypto")
+        
+    def __del__(self):
+        self.clear_key_cache()
+        # The worker thread would otherwise outlive the service
+        pool = getattr(self, '_crypto_pool', None)
+        if pool is not None:
+            pool.shutdown(wait=False)
+        
+    @classmethod
+    def calibrate_iterations(cls) -> int:
         """
-        Encrypt a message using AES-GCM with PBKDF2 key derivation
+        Pick a PBKDF2 iteration count that takes about PBKDF2_TARGET_MS here
+        
+        The measurement runs on first use and is shared by every instance.
+        The count used for a message is stored in its stego header, so
+        files stay decodable on machines that calibrate differently.
+        
+        Returns:
+            Iteration count clamped to [PBKDF2_MIN_ITERATIONS, PBKDF2_MAX_ITERATIONS]
+        """
+        with cls._calibration_lock:
+            if cls._calibrated_iterations is None:
+                start = time.perf_counter()
+                hashlib.pbkdf2_hmac('sha256', b'calibration', os.urandom(16),
+                                    cls.PBKDF2_CALIBRATION_ITERATIONS, 32)
+                elapsed_ms = max((time.perf_counter() - start) * 1000, 1e-3)
+                
+                iterations = int(cls.PBKDF2_CALIBRATION_ITERATIONS * cls.PBKDF2_TARGET_MS / elapsed_ms)
+                cls._calibrated_iterations = min(max(iterations, cls.PBKDF2_MIN_ITERATIONS),
+                                                 cls.PBKDF2_MAX_ITERATIONS)
+                
+            return cls._calibrated_iterations
+            
+    @property
+    def kdf_params(self) -> dict:
+        """
+        Key derivation settings new messages are encrypted with
+        
+        Stored in the stego header, so a decoder can derive the same key
+        whatever kdf it was created with. PBKDF2 entries carry 'iterations';
+        scrypt entries carry 'n', 'r' and 'p'.
+        """
+        if self.kdf == 'scrypt':
+            return {'kdf': 'scrypt', 'n': self.scrypt_n, 'r': self.scrypt_r, 'p': self.scrypt_p}
+        return {'kdf': 'pbkdf2', 'iterations': self.key_iterations}
+        
+    def _resolve_kdf_params(self, iterations: Optional[int] = None,
+                            kdf_params: Optional[dict] = None) -> dict:
+        """kdf_params if given, else this service's settings with iterations overridden"""
+        if kdf_params is not None:
+            if kdf_params.get('kdf') not in self.SUPPORTED_KDFS:
+                raise StegoError(f"Unsupported key derivation function: {kdf_params.get('kdf')}")
+            return kdf_params
+            
+        params = self.kdf_params
+        if iterations is not None and params['kdf'] == 'pbkdf2':
+            params['iterations'] = iterations
+        return params
+        
+    def clear_key_cache(self) -> None:
+        """Drop all cached derived keys and their cipher instances"""
+        for name in ('_key_cache', '_cipher_cache'):
+            cache = getattr(self, name, None)
+            if cache is not None:
+                cache.clear()
+        
+    def encrypt_message(self, message: Union[str, bytes], 
+                        password: str) -> Tuple[bytes, bytes, bytes]:
+        """
+        Encrypt a message using AES-GCM, with the key derived as kdf_params says
         
         Args:
-            message: Plain text message to encrypt
+            message: Plain text message to encrypt, or its UTF-8 bytes
             password: Password for encryption
             
         Returns:
             Tuple of (encrypted_data, salt, nonce)
         """
         try:
-            # Convert message to bytes
-            message_bytes = message.encode('utf-8')
+            message_bytes = self._message_bytes(message)
             
-            # Generate random salt and nonce
-            salt = os.urandom(self.salt_length)
-            nonce = os.urandom(self.nonce_length)
+            # Generate random salt and nonce from a single getrandom() call
+            random_bytes = os.urandom(self.salt_length + self.nonce_length)
+            salt = random_bytes[:self.salt_length]
+            nonce = random_bytes[self.salt_length:]
             
-            # Derive key from password using PBKDF2
+            # Derive key from password with this service's KDF settings
             key = self._derive_key(password, salt)
             
             # Encrypt using AES-GCM
-            aesgcm = AESGCM(key)
+            aesgcm = self._get_cipher(key)
             encrypted_data = aesgcm.encrypt(nonce, message_bytes, None)
             
             return encrypted_data, salt, nonce
@@ -54,26 +174,78 @@ class CryptoService:
         except Exception as e:
             raise StegoError(f"Encryption failed: {str(e)}")
             
+    def encrypt_message_async(self, message: Union[str, bytes], password: str) -> Future:
+        """
+        Run encrypt_message on the crypto worker thread
+        
+        Returns:
+            Future resolving to (encrypted_data, salt, nonce)
+        """
+        return self._crypto_pool.submit(self.encrypt_message, message, password)
+        
+    def encrypt_many(self, messages: Sequence[Union[str, bytes]], 
+                     password: str) -> Tuple[List[bytes], bytes, List[bytes]]:
+        """
+        Encrypt several messages under one salt, deriving the key only once
+        
+        Args:
+            messages: Plain text messages to encrypt, or their UTF-8 bytes
+            password: Password for encryption
+            
+        Returns:
+            Tuple of (encrypted_data_list, salt, nonce_list)
+        """
+        try:
+            salt = os.urandom(self.salt_length)
+            key = self._derive_key(password, salt)
+            aesgcm = self._get_cipher(key)
+            
+            # Draw every nonce in one call. The last 4 bytes of each nonce are
+            # replaced by a per-message counter, so nonces within a batch are
+            # guaranteed distinct even if the random prefixes collide.
+            prefix_length = self.nonce_length - 4
+            random_bytes = os.urandom(prefix_length * len(messages))
+            
+            encrypted_list = []
+            nonces = []
+            for index, message in enumerate(messages):
+                offset = index * prefix_length
+                nonce = (random_bytes[offset:offset + prefix_length] +
+                         index.to_bytes(4, 'big'))
+                encrypted_list.append(aesgcm.encrypt(nonce, self._message_bytes(message), None))
+                nonces.append(nonce)
+                
+            return encrypted_list, salt, nonces
+            
+        except Exception as e:
+            raise StegoError(f"Encryption failed: {str(e)}")
+            
     def decrypt_message(self, encrypted_data: bytes, password: str, 
-                       salt: bytes, nonce: bytes) -> str:
+                       salt: bytes, nonce: bytes, iterations: Optional[int] = None,
+                       kdf_params: Optional[dict] = None) -> str:
         """
-        Decrypt a message using AES-GCM with PBKDF2 key derivation
+        Decrypt a message using AES-GCM with PBKDF2 (or scrypt) key derivation
         
         Args:
             encrypted_data: Encrypted message data
             password: Password for decryption
             salt: Salt used for key derivation
             nonce: Nonce used for encryption
+            iterations: PBKDF2 iterations used for encryption; defaults to
+                        key_iterations
+            kdf_params: Key derivation settings used for encryption, as
+                        returned by StegoService.extract_message; overrides
+                        kdf and iterations when given
             
         Returns:
             Decrypted plain text message
         """
         try:
             # Derive key from password using same salt
-            key = self._derive_key(password, salt)
+            key = self._derive_key(password, salt, iterations, kdf_params)
             
             # Decrypt using AES-GCM
-            aesgcm = AESGCM(key)
+            aesgcm = self._get_cipher(key)
             decrypted_bytes = aesgcm.decrypt(nonce, encrypted_data, None)
             
             # Convert back to string
@@ -88,55 +260,199 @@ class CryptoService:
         except Exception as e:
             raise StegoError(f"Decryption failed: {str(e)}")
             
-    def _derive_key(self, password: str, salt: bytes) -> bytes:
+    def decrypt_message_async(self, encrypted_data: bytes, password: str,
+                              salt: bytes, nonce: bytes,
+                              iterations: Optional[int] = None,
+                              kdf_params: Optional[dict] = None) -> Future:
+        """
+        Run decrypt_message on the crypto worker thread
+        
+        Returns:
+            Future resolving to the decrypted plain text message
+        """
+        return self._crypto_pool.submit(self.decrypt_message, encrypted_data,
+                                        password, salt, nonce, iterations, kdf_params)
+        
+    def decrypt_many(self, encrypted_list: Sequence[bytes], password: str,
+                     salt: bytes, nonces: Sequence[bytes],
+                     iterations: Optional[int] = None,
+                     kdf_params: Optional[dict] = None) -> List[str]:
+        """
+        Decrypt messages produced by encrypt_many, deriving the key only once
+        
+        Args:
+            encrypted_list: Encrypted message data
+            password: Password for decryption
+            salt: Shared salt used for key derivation
+            nonces: Per-message nonces, in the same order as encrypted_list
+            iterations: PBKDF2 iterations used for encryption; defaults to
+                        key_iterations
+            kdf_params: Key derivation settings used for encryption;
+                        overrides kdf and iterations when given
+            
+        Returns:
+            Decrypted plain text messages
+        """
+        try:
+            key = self._derive_key(password, salt, iterations, kdf_params)
+            aesgcm = self._get_cipher(key)
+            
+            return [
+                aesgcm.decrypt(nonce, encrypted_data, None).decode('utf-8')
+                for encrypted_data, nonce in zip(encrypted_list, nonces)
+            ]
+            
+        except InvalidTag:
+            raise StegoError("Decryption failed: Invalid password or corrupted data")
+        except UnicodeDecodeError:
+            raise StegoError("Decryption failed: Invalid message encoding")
+        except Exception as e:
+            raise StegoError(f"Decryption failed: {str(e)}")
+            
+    @staticmethod
+    def _message_bytes(message: Union[str, bytes]) -> bytes:
+        """Convert message to UTF-8 bytes unless the caller already did"""
+        return message.encode('utf-8') if isinstance(message, str) else message
+        
+    def _get_cipher(self, key: bytes) -> AESGCM:
+        """Return a cached AESGCM instance for the key, creating it if needed"""
+        # AESGCM and the Cipher(AES, GCM) API both run on OpenSSL's EVP
+        # AES-GCM, which uses AES-NI/CLMUL when the CPU has them. For short
+        # messages a cached AESGCM is the cheaper of the two: it is a single
+        # call, whereas Cipher needs a new context plus update/finalize/tag
+        # every time.
+        with self._key_cache_lock:
+            aesgcm = self._cipher_cache.get(key)
+            if aesgcm is not None:
+                self._cipher_cache.move_to_end(key)
+                return aesgcm
+                
+            aesgcm = AESGCM(key)
+            self._cipher_cache[key] = aesgcm
+            if len(self._cipher_cache) > self.key_cache_size:
+                self._cipher_cache.popitem(last=False)
+                
+            return aesgcm
+            
+    def _derive_key(self, password: str, salt: bytes, 
+                    iterations: Optional[int] = None,
+                    kdf_params: Optional[dict] = None) -> bytes:
         """
-        Derive encryption key from password using PBKDF2-HMAC-SHA256
+        Derive encryption key from password, reusing a cached key when the
+        same password and salt were used recently
         
         Args:
             password: User password
             salt: Random salt
+            iterations: PBKDF2 iterations; defaults to key_iterations
+            kdf_params: Key derivation settings (see kdf_params); overrides
+                        kdf and iterations when given
             
         Returns:
             Derived key bytes
         """
-        try:
-            password_bytes = password.encode('utf-8')
+        params = self._resolve_kdf_params(iterations, kdf_params)
             
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=self.key_length,
-                salt=salt,
-                iterations=self.key_iterations,
-            )
+        password_bytes = password.encode('utf-8')
+        cache_key = (
+            hashlib.blake2b(password_bytes, digest_size=16).digest(),
+            bytes(salt),
+            tuple(sorted(params.items()))
+        )
+        
+        with self._key_cache_lock:
+            key = self._key_cache.get(cache_key)
+            if key is not None:
+                self._key_cache.move_to_end(cache_key)
+                return key
+                
+        key = self._run_kdf(password_bytes, salt, params)
+        
+        with self._key_cache_lock:
+            self._key_cache[cache_key] = key
+            if len(self._key_cache) > self.key_cache_size:
+                self._key_cache.popitem(last=False)
+                
+        return key
+        
+    def _run_kdf(self, password_bytes: bytes, salt: bytes, params: dict) -> bytes:
+        """
+        Run PBKDF2-HMAC-SHA256 or scrypt, as params say, without consulting
+        the key cache
+        
+        hashlib dispatches to OpenSSL's PBKDF2, which uses the SHA
+        instruction extensions where the CPU provides them.
+        
+        Args:
+            password_bytes: UTF-8 encoded password
+            salt: Random salt
+            params: Resolved key derivation settings (see kdf_params)
             
-            key = kdf.derive(password_bytes)
-            return key
+        Returns:
+            Derived key bytes
+        """
+        try:
+            if params['kdf'] == 'scrypt':
+                # OpenSSL's default 32 MiB memory cap stays in place, so cost
+                # parameters read from a file header can't demand more
+                return hashlib.scrypt(
+                    password_bytes,
+                    salt=salt,
+                    n=params['n'],
+                    r=params['r'],
+                    p=params['p'],
+                    dklen=self.key_length
+                )
+                
+            return hashlib.pbkdf2_hmac(
+                'sha256',
+                password_bytes,
+                salt,
+                params['iterations'],
+                self.key_length
+            )
             
         except Exception as e:
             raise StegoError(f"Key derivation failed: {str(e)}")
             
-    def generate_key_for_scatter(self, password: str, salt: bytes) -> bytes:
+    def derive_key(self, password: str, salt: bytes, 
+                   iterations: Optional[int] = None,
+                   kdf_params: Optional[dict] = None) -> bytes:
         """
-        Generate a separate key for bit scattering PRNG seeding
+        Derive (or fetch from cache) the base key for a password and salt
         
         Args:
             password: User password
             salt: Salt from encryption
+            iterations: PBKDF2 iterations; defaults to key_iterations
+            kdf_params: Key derivation settings used for encryption;
+                        overrides kdf and iterations when given
+            
+        Returns:
+            Base key bytes, suitable for generate_key_for_scatter
+        """
+        return self._derive_key(password, salt, iterations, kdf_params)
+        
+    def generate_key_for_scatter(self, base_key: bytes) -> bytes:
+        """
+        Generate a separate key for bit scattering PRNG seeding
+        
+        Expands an already derived base key with HKDF-Expand (a single HMAC)
+        instead of re-running the password KDF.
+        
+        Args:
+            base_key: Key returned by derive_key for the same password/salt
             
         Returns:
             Key for scatter PRNG
         """
         try:
-            # Use HKDF-like approach with different info
-            base_key = self._derive_key(password, salt)
-            
-            # Create scatter key by hashing base key with constant
-            scatter_info = b"AudioStegoScatter"
-            hasher = hashlib.sha256()
-            hasher.update(base_key)
-            hasher.update(scatter_info)
-            
-            return hasher.digest()[:16]  # 128-bit key for scatter
+            hkdf = HKDFExpand(
+                algorithm=hashes.SHA256(),
+                length=16,  # 128-bit key for scatter
+                info=b"AudioStegoScatter"
+            )
+            return hkdf.derive(base_key)
             
         except Exception as e:
             raise StegoError(f"Scatter key generation failed: {str(e)}")
@@ -171,12 +487,24 @@ class CryptoService:
         if len(password) < 12:
             return True, "Password is acceptable but could be longer"
             
-        has_upper = any(c.isupper() for c in password)
-        has_lower = any(c.islower() for c in password)
-        has_digit = any(c.isdigit() for c in password)
-        has_special = any(c in "!@#$%^&*()_+-=[]{}|;:,.<>?" for c in password)
-        
-        strength_count = sum([has_upper, has_lower, has_digit, has_special])
+        mask = 0
+        if password.isascii():
+            # One C-level pass: map every byte to its class bits, then OR
+            # together the (at most 16) distinct masks
+            for class_bits in set(password.encode('ascii').translate(_CHAR_CLASS)):
+                mask |= class_bits
+        else:
+            for c in password:
+                if c.isupper():
+                    mask |= _UPPER
+                elif c.islower():
+                    mask |= _LOWER
+                elif c.isdigit():
+                    mask |= _DIGIT
+                elif c in _SPECIAL_CHARS:
+                    mask |= _SPECIAL
+                    
+        strength_count = bin(mask).count('1')
         
         if strength_count >= 3:
             return True, "Strong password"
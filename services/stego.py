@@ -2,25 +2,174 @@
 Steganography service for embedding and extracting messages in audio
 """
 
+import functools
 import struct
+import sys
 import numpy as np
 import hashlib
 import random
-from typing import Tuple, Optional
+from typing import Callable, Iterable, Iterator, Optional, Tuple
 
 from services.audio import AudioService
-from utils.bytes import BitPacker, calculate_crc32
+from services._stego_kernels import embed_groups, embed_run, extract_scatter
+from utils.bytes import calculate_crc32, calculate_crc32c
 from utils.errors import StegoError
 
 
+# Header layouts (without the trailing checksum). Version 2 adds the key
+# derivation used to encrypt the payload - KDF id, PBKDF2 iteration count and
+# scrypt log2(n), r and p - and is checked with CRC-32C; version 1 files use
+# zlib's CRC32 and always used PBKDF2 with LEGACY_ITERATIONS.
+HEADER_FORMATS = {
+    1: '>4s B B 16s 12s I',
+    2: '>4s B B 16s 12s I B I B B B',
+}
+LEGACY_ITERATIONS = 200000
+
+# KDF id byte of a version 2 header
+KDF_IDS = {'pbkdf2': 0, 'scrypt': 1}
+KDF_NAMES = {kdf_id: name for name, kdf_id in KDF_IDS.items()}
+
+# Payload bytes written between embed_message progress callbacks
+PROGRESS_CHUNK_BYTES = 64 * 1024
+
+# Scatter permutation: a 4-round unbalanced Feistel network over the smallest
+# bit width covering the sample range, with cycle-walking back into range
+FEISTEL_ROUNDS = 4
+_GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+_MIX_MUL1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_MUL2 = np.uint64(0x94D049BB133111EB)
+
+
+def _splitmix64(seed: int, count: int) -> np.ndarray:
+    """
+    First count outputs of SplitMix64 started at seed
+    
+    Args:
+        seed: 64-bit generator state
+        count: Number of outputs
+        
+    Returns:
+        uint64 array of outputs
+    """
+    outputs = []
+    for _ in range(count):
+        seed = (seed + _GOLDEN_GAMMA) & _MASK64
+        z = seed
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+        outputs.append(z ^ (z >> 31))
+    return np.array(outputs, dtype=np.uint64)
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_round_keys(salt: bytes) -> tuple:
+    """Round keys for a salt as a hashable tuple, memoised across calls"""
+    seed = int.from_bytes(salt[:8], 'little') ^ _GOLDEN_GAMMA
+    return tuple(_splitmix64(seed, FEISTEL_ROUNDS).tolist())
+
+
+def scatter_round_keys(salt: bytes) -> np.ndarray:
+    """
+    Feistel round keys for a message salt
+    
+    Scatter is obfuscation only - confidentiality and integrity come from
+    AES-GCM - so the keys are a SplitMix64 stream seeded from the salt
+    rather than a cryptographic hash. Derivations are cached, so embedding
+    and re-reading the same message derive the keys once.
+    
+    Args:
+        salt: Salt stored in the stego header
+        
+    Returns:
+        uint64 array of FEISTEL_ROUNDS keys
+    """
+    return np.array(_cached_round_keys(bytes(salt)), dtype=np.uint64)
+
+
+def _feistel_permute(values: np.ndarray, round_keys: np.ndarray, 
+                     bits: int) -> np.ndarray:
+    """
+    Apply the keyed Feistel permutation of [0, 2**bits) elementwise
+    
+    The value is split into a high half of bits - bits // 2 bits and a low
+    half of bits // 2 bits. Rounds alternate which half is XORed with the
+    round function of the other, so every round is invertible whatever the
+    two widths are, and odd bit widths work.
+    
+    Args:
+        values: uint64 inputs below 2**bits
+        round_keys: One uint64 key per round
+        bits: Width of the permuted domain in bits
+        
+    Returns:
+        Permuted uint64 values
+    """
+    low_bits = bits // 2
+    high_mask = np.uint64((1 << (bits - low_bits)) - 1)
+    low_mask = np.uint64((1 << low_bits) - 1)
+    shift = np.uint64(low_bits)
+    
+    high = values >> shift
+    low = values & low_mask
+    
+    with np.errstate(over='ignore'):
+        for round_index, key in enumerate(round_keys[:FEISTEL_ROUNDS]):
+            # SplitMix64 finaliser as the round function
+            z = (low if round_index % 2 == 0 else high) ^ key
+            z = (z ^ (z >> np.uint64(30))) * _MIX_MUL1
+            z = (z ^ (z >> np.uint64(27))) * _MIX_MUL2
+            z ^= z >> np.uint64(31)
+            
+            if round_index % 2 == 0:
+                high = high ^ (z & high_mask)
+            else:
+                low = low ^ (z & low_mask)
+                
+    return (high << shift) | low
+
+
+def feistel_indices(positions: np.ndarray, round_keys: np.ndarray, 
+                    domain_size: int) -> np.ndarray:
+    """
+    Map payload bit positions to sample indices under a keyed permutation
+    
+    Each position is permuted independently, so embed and extract compute
+    only the indices they touch, in O(len(positions)).
+    
+    Args:
+        positions: uint64 bit positions, each below domain_size
+        round_keys: Keys from scatter_round_keys
+        domain_size: Number of samples available for scattering
+        
+    Returns:
+        Array of distinct sample indices in [0, domain_size)
+    """
+    # The permuted domain is less than twice domain_size, so on average
+    # fewer than two walks are needed per index
+    bits = max(1, (domain_size - 1).bit_length())
+    indices = _feistel_permute(positions, round_keys, bits)
+    
+    # Cycle-walk: re-encrypt values that fell outside the range. Inputs are
+    # below domain_size, so outputs stay distinct.
+    pending = np.flatnonzero(indices >= domain_size)
+    while len(pending):
+        walked = _feistel_permute(indices[pending], round_keys, bits)
+        indices[pending] = walked
+        pending = pending[walked >= domain_size]
+        
+    return indices.astype(np.intp)
+
+
 class StegoService:
     """Service for LSB steganography operations"""
     
     def __init__(self):
         self.audio_service = AudioService()
         self.magic_bytes = b'ASTG'  # Audio STеGanography
-        self.version = 1
-        self.header_size = 42  # Total header size in bytes
+        self.version = 2
+        self.header_size = self._header_size(self.version)  # Total header size in bytes
         
     def calculate_capacity(self, audio_file: str, lsb_bits: int = 1) -> int:
         """
@@ -34,20 +183,18 @@ class StegoService:
             Capacity in bytes (excluding header)
         """
         try:
-            audio_data, sample_rate = self.audio_service.load_audio(audio_file)
+            # Header-only probe; the samples themselves are not decoded
+            info = self.audio_service.get_audio_info(audio_file)
             
             # Get total number of samples
-            if len(audio_data.shape) == 1:
-                total_samples = len(audio_data)
-            else:
-                total_samples = audio_data.shape[0] * audio_data.shape[1]
-                
-            # Calculate total bits available
-            total_bits = total_samples * lsb_bits
+            total_samples = info['frames'] * info['channels']
+            
+            # Calculate payload bits available: the header takes one bit in
+            # each of its samples, the remaining samples carry lsb_bits each
+            payload_bits = max(0, total_samples - self.header_size * 8) * lsb_bits
             
-            # Convert to bytes and subtract header size
-            total_bytes = total_bits // 8
-            available_bytes = max(0, total_bytes - self.header_size)
+            # Convert to bytes
+            available_bytes = payload_bits // 8
             
             return available_bytes
             
@@ -55,8 +202,10 @@ class StegoService:
             raise StegoError(f"Failed to calculate capacity: {str(e)}")
             
     def embed_message(self, audio_data: np.ndarray, encrypted_data: bytes,
-                     salt: bytes, nonce: bytes, lsb_bits: int = 1, 
-                     scatter: bool = True) -> np.ndarray:
+                     salt: bytes, nonce: bytes, kdf_params: dict, lsb_bits: int = 1, 
+                     scatter: bool = True,
+                     progress_cb: Optional[Callable[[int, int], None]] = None,
+                     out: Optional[np.ndarray] = None) -> np.ndarray:
         """
         Embed encrypted message in audio using LSB steganography
         
@@ -65,80 +214,72 @@ class StegoService:
             encrypted_data: Encrypted message data
             salt: Salt for key derivation
             nonce: Nonce for encryption
+            kdf_params: Key derivation used for the encryption key
+                        (CryptoService.kdf_params), stored in the header
             lsb_bits: Number of LSB bits to use
             scatter: Whether to scatter bits randomly
+            progress_cb: Called as progress_cb(bytes_done, bytes_total) after
+                         the header and after every PROGRESS_CHUNK_BYTES of payload
+            out: Writable C-contiguous buffer with audio_data's shape and dtype
+                 to write the result into instead of allocating a copy. It
+                 may be audio_data itself (e.g. a copy-on-write mapping from
+                 load_audio_mmap) to embed in place.
             
         Returns:
             Modified audio data with embedded message
         """
         try:
-            # Create header
-            header = self._create_header(salt, nonce, len(encrypted_data), lsb_bits, scatter)
-            
-            # Combine header and payload
-            payload = header + encrypted_data
-            
-            # Check capacity
-            total_samples = audio_data.size
-            required_bits = len(payload) * 8
-            available_bits = total_samples * lsb_bits
+            if out is not None:
+                if not (out.flags.writeable and out.flags.c_contiguous):
+                    raise StegoError("Output buffer must be a writable C-contiguous array")
+                if out.shape != audio_data.shape or out.dtype != audio_data.dtype:
+                    raise StegoError("Output buffer must match the audio shape and dtype")
+                    
+            header_bits, sample_idx, groups, group_count, mask = self._plan_embed(
+                audio_data.size, encrypted_data, salt, nonce, kdf_params, lsb_bits, scatter
+            )
+            header_len = len(header_bits)
+            total_bytes = self.header_size + len(encrypted_data)
+            payload = np.frombuffer(encrypted_data, dtype=np.uint8)
             
-            if required_bits > available_bits:
-                raise StegoError(
-                    f"Insufficient capacity: need {required_bits} bits, "
-                    f"but only {available_bits} available"
-                )
-                
-            # Flatten audio data for easier processing
+            # Flatten audio data for easier processing. ravel() of a
+            # C-contiguous array is a view, so at most one copy is made.
             original_shape = audio_data.shape
-            flat_audio = audio_data.flatten().copy()
-            
-            # Convert payload to bits
-            bit_packer = BitPacker()
-            payload_bits = bit_packer.bytes_to_bits(payload)
-            
-            # Embed header bits first (always sequential)
-            header_bits = payload_bits[:self.header_size * 8]
-            payload_data_bits = payload_bits[self.header_size * 8:]
-            
-            # Embed header sequentially
-            for i, bit in enumerate(header_bits):
-                sample_idx = i
-                sample = flat_audio[sample_idx]
-                mask = ~((1 << lsb_bits) - 1)
-                cleared_sample = sample & mask
-                if bit:
-                    new_sample = cleared_sample | 1
-                else:
-                    new_sample = cleared_sample
-                flat_audio[sample_idx] = new_sample
+            if out is not None:
+                if out is not audio_data:
+                    np.copyto(out, audio_data)
+                flat_audio = out.ravel()
+            else:
+                flat_audio = np.array(audio_data, order='C').ravel()
             
-            # Embed payload bits
-            if scatter:
-                payload_indices = self._generate_scatter_indices(
-                    len(payload_data_bits), total_samples - self.header_size * 8, salt
-                )
+            # Embed header sequentially, one bit in the LSB of each sample
+            flat_audio[:header_len] = (
+                (flat_audio[:header_len] & ~1) | header_bits.astype(flat_audio.dtype)
+            )
+            if progress_cb:
+                progress_cb(self.header_size, total_bytes)
             
-            for i, bit in enumerate(payload_data_bits):
-                if scatter:
-                    sample_idx = self.header_size * 8 + payload_indices[i]
-                else:
-                    sample_idx = self.header_size * 8 + i
-                
-                # Modify the LSBs of the sample
-                sample = flat_audio[sample_idx]
-                
-                # Clear the specified number of LSBs
-                mask = ~((1 << lsb_bits) - 1)
-                cleared_sample = sample & mask
+            # Embed payload bits, lsb_bits of them in the low bits of each
+            # sample; the kernels expand each group straight from the bytes
+            sample_mask = flat_audio.dtype.type(mask)
+            
+            # One pass without a callback, otherwise PROGRESS_CHUNK_BYTES at a time
+            chunk = max(1, group_count)
+            if progress_cb:
+                chunk = max(1, PROGRESS_CHUNK_BYTES * 8 // lsb_bits)
                 
-                # Set the new LSB value (for multi-bit LSB, we use just the lowest bit)
-                if bit:
-                    new_sample = cleared_sample | 1
+            for start in range(0, group_count, chunk):
+                stop = min(start + chunk, group_count)
+                if sample_idx is not None:
+                    embed_groups(flat_audio, sample_idx[start:stop], groups[start:stop],
+                                 payload, lsb_bits, sample_mask)
                 else:
-                    new_sample = cleared_sample
+                    embed_run(flat_audio, header_len + start, start, stop - start,
+                              payload, lsb_bits, sample_mask)
                     
-                flat_audio[sample_idx] = new_sample
+                if progress_cb:
+                    bytes_done = min(len(encrypted_data), stop * lsb_bits // 8)
+                    progress_cb(self.header_size + bytes_done, total_bytes)
                 
             # Reshape back to original shape
             modified_audio = flat_audio.reshape(original_shape)
@@ -148,7 +289,133 @@ class StegoService:
         except Exception as e:
             raise StegoError(f"Failed to embed message: {str(e)}")
             
-    def extract_message(self, audio_data: np.ndarray) -> Tuple[bytes, bytes, bytes]:
+    def embed_stream(self, chunks: Iterable[np.ndarray], total_samples: int,
+                     encrypted_data: bytes, salt: bytes, nonce: bytes, kdf_params: dict,
+                     lsb_bits: int = 1, scatter: bool = True,
+                     progress_cb: Optional[Callable[[int, int], None]] = None
+                     ) -> Iterator[np.ndarray]:
+        """
+        Embed encrypted message in audio that arrives block by block
+        
+        Produces exactly the samples embed_message would, without holding
+        more than one block: the scatter positions are sorted, so each block
+        takes the next contiguous run of them.
+        
+        Args:
+            chunks: Writable 1-D sample blocks in order (e.g. from
+                    AudioService.iter_chunks); they are modified in place
+            total_samples: Total number of samples across all blocks
+            encrypted_data: Encrypted message data
+            salt: Salt for key derivation
+            nonce: Nonce for encryption
+            kdf_params: Key derivation used for the encryption key
+                        (CryptoService.kdf_params), stored in the header
+            lsb_bits: Number of LSB bits to use
+            scatter: Whether to scatter bits randomly
+            progress_cb: Called as progress_cb(bytes_done, bytes_total) after
+                         each block, in proportion to the samples processed
+            
+        Returns:
+            Iterator over the modified blocks
+        """
+        try:
+            header_bits, sample_idx, groups, group_count, mask = self._plan_embed(
+                total_samples, encrypted_data, salt, nonce, kdf_params, lsb_bits, scatter
+            )
+            header_len = len(header_bits)
+            total_bytes = self.header_size + len(encrypted_data)
+            payload = np.frombuffer(encrypted_data, dtype=np.uint8)
+            
+            offset = 0   # Sample index of the current block's first sample
+            consumed = 0  # Payload groups written so far
+            
+            for chunk in chunks:
+                flat_chunk = chunk.reshape(-1)
+                end = offset + len(flat_chunk)
+                dtype = flat_chunk.dtype
+                
+                if offset < header_len:
+                    header_end = min(end, header_len)
+                    head = flat_chunk[:header_end - offset]
+                    head[:] = (head & ~1) | header_bits[offset:header_end].astype(dtype)
+                    
+                if sample_idx is not None:
+                    stop = int(np.searchsorted(sample_idx, end))
+                    if stop > consumed:
+                        embed_groups(flat_chunk, sample_idx[consumed:stop] - offset,
+                                     groups[consumed:stop], payload, lsb_bits, dtype.type(mask))
+                else:
+                    stop = min(group_count, max(0, end - header_len))
+                    if stop > consumed:
+                        embed_run(flat_chunk, header_len + consumed - offset, consumed,
+                                  stop - consumed, payload, lsb_bits, dtype.type(mask))
+                consumed = max(consumed, stop)
+                offset = end
+                
+                if progress_cb:
+                    progress_cb(min(total_samples, offset) * total_bytes // total_samples,
+                                total_bytes)
+                yield chunk
+                
+            if offset != total_samples:
+                raise StegoError(f"Audio stream has {offset} samples, expected {total_samples}")
+                
+        except Exception as e:
+            raise StegoError(f"Failed to embed message: {str(e)}")
+            
+    def _plan_embed(self, total_samples: int, encrypted_data: bytes, salt: bytes, nonce: bytes,
+                    kdf_params: dict, lsb_bits: int, scatter: bool) -> tuple:
+        """
+        Work out what to write where, independent of how the samples are held
+        
+        Returns:
+            Tuple of (header_bits, sample_idx, groups, group_count, mask):
+            the header's 0/1 bits for the first samples, the ascending sample
+            indices of the payload and the lsb_bits-wide payload group each
+            one carries (both None when not scattered, meaning group g goes
+            in the g-th sample after the header), the number of groups and
+            the mask that clears the low bits
+        """
+        if lsb_bits < 1 or lsb_bits > 3:
+            raise StegoError(f"Invalid LSB bits: {lsb_bits}")
+            
+        # Create header
+        header = self._create_header(salt, nonce, len(encrypted_data), lsb_bits, scatter,
+                                     kdf_params)
+        
+        # Check capacity: the header takes 1 bit per sample, the rest of
+        # the samples carry lsb_bits bits each
+        header_len = self.header_size * 8
+        required_bits = (len(header) + len(encrypted_data)) * 8
+        available_bits = (min(total_samples, header_len) +
+                          max(0, total_samples - header_len) * lsb_bits)
+        
+        if required_bits > available_bits:
+            raise StegoError(
+                f"Insufficient capacity: need {required_bits} bits, "
+                f"but only {available_bits} available"
+            )
+            
+        # Only the header is expanded to a 0/1 array (MSB first); the
+        # payload stays packed and is split into groups by the kernels
+        header_bits = np.unpackbits(np.frombuffer(header, dtype=np.uint8))
+        group_count = -(-len(encrypted_data) * 8 // lsb_bits)
+        mask = ~((1 << lsb_bits) - 1)
+        
+        sample_idx = None
+        groups = None
+        if scatter:
+            payload_indices = self._generate_scatter_indices(
+                group_count, total_samples - header_len, salt, self.version
+            )
+            # Write in ascending sample order so the scatter walks the
+            # buffer front to back instead of missing cache on every bit
+            groups = np.argsort(payload_indices)
+            sample_idx = header_len + payload_indices[groups]
+            
+        return header_bits, sample_idx, groups, group_count, mask
+            
+    def extract_message(self, audio_data: np.ndarray) -> Tuple[bytes, bytes, bytes, dict]:
         """
         Extract encrypted message from audio
         
@@ -156,29 +423,28 @@ class StegoService:
             audio_data: Audio samples with embedded message
             
         Returns:
-            Tuple of (encrypted_data, salt, nonce)
+            Tuple of (encrypted_data, salt, nonce, kdf_params), where
+            kdf_params is the key derivation from the header, to pass on to
+            CryptoService.decrypt_message
         """
         try:
-            # Flatten audio data
-            flat_audio = audio_data.flatten()
-            
-            # Extract header first (try without scatter)
-            header_bits_needed = self.header_size * 8
-            header_bits = []
-            
-            for i in range(header_bits_needed):
-                if i >= len(flat_audio):
-                    raise StegoError("Audio file too short for header")
-                sample = flat_audio[i]
-                bit = sample & 1  # Extract LSB
-                header_bits.append(bit)
+            # Flatten audio data (a view for contiguous input; nothing is written)
+            flat_audio = audio_data.ravel()
+            
+            # Extract header first (try without scatter). Read enough bits for
+            # the largest header; the version byte tells how many are header.
+            if len(flat_audio) < self._header_size(1) * 8:
+                raise StegoError("Audio file too short for header")
                 
-            # Convert header bits to bytes
-            bit_packer = BitPacker()
-            header_bytes = bit_packer.bits_to_bytes(header_bits)
+            max_header_bits = min(self.header_size * 8, len(flat_audio) // 8 * 8)
+            
+            # Gather the LSBs of the header samples and pack them to bytes (MSB first)
+            header_lsb = (flat_audio[:max_header_bits] & 1).astype(np.uint8)
+            header_bytes = np.packbits(header_lsb).tobytes()
             
             # Parse header
             header_info = self._parse_header(header_bytes)
+            header_bits_needed = header_info['header_size'] * 8
             
             # Extract payload based on header info
             payload_size = header_info['payload_length']
@@ -187,68 +453,113 @@ class StegoService:
             salt = header_info['salt']
             nonce = header_info['nonce']
             
-            # Calculate total bits needed
-            total_bits_needed = (self.header_size + payload_size) * 8
-            
-            # Extract payload bits more efficiently
-            payload_bits = []
+            # Version 1 only ever wrote the lowest bit, whatever lsb_bits said
+            if header_info['version'] == 1:
+                lsb_bits = 1
+            bit_mask = (1 << lsb_bits) - 1
+            payload_bit_count = payload_size * 8
+            payload_samples = -(-payload_bit_count // lsb_bits)
             
             if scatter:
                 # Generate scatter indices for payload only
                 payload_indices = self._generate_scatter_indices(
-                    payload_size * 8, len(flat_audio) - header_bits_needed, salt
+                    payload_samples, len(flat_audio) - header_bits_needed, salt,
+                    header_info['version']
                 )
+                # Read in ascending sample order, then put the bits back into
+                # payload order
+                order = np.argsort(payload_indices)
+                sample_idx = header_bits_needed + payload_indices[order]
+                if len(sample_idx) and sample_idx[-1] >= len(flat_audio):
+                    raise StegoError("Audio file too short for complete message")
+                    
                 # Extract payload bits using scatter pattern
-                for idx in payload_indices:
-                    actual_idx = header_bits_needed + idx
-                    if actual_idx >= len(flat_audio):
-                        raise StegoError("Audio file too short for complete message")
-                    sample = flat_audio[actual_idx]
-                    bit = sample & 1
-                    payload_bits.append(bit)
+                sorted_values = np.empty(len(sample_idx), dtype=np.uint8)
+                extract_scatter(flat_audio, sample_idx, sorted_values,
+                                flat_audio.dtype.type(bit_mask))
+                payload_values = np.empty_like(sorted_values)
+                payload_values[order] = sorted_values
             else:
                 # Extract payload bits sequentially after header
-                for i in range(payload_size * 8):
-                    actual_idx = header_bits_needed + i
-                    if actual_idx >= len(flat_audio):
-                        raise StegoError("Audio file too short for complete message")
-                    sample = flat_audio[actual_idx]
-                    bit = sample & 1
-                    payload_bits.append(bit)
+                payload_end = header_bits_needed + payload_samples
+                if payload_end > len(flat_audio):
+                    raise StegoError("Audio file too short for complete message")
+                    
+                payload_values = (flat_audio[header_bits_needed:payload_end] & bit_mask).astype(np.uint8)
                 
             # Convert payload bits to bytes
-            encrypted_data = bit_packer.bits_to_bytes(payload_bits)
+            payload_bits = self._lsb_values_to_bits(payload_values, lsb_bits, payload_bit_count)
+            encrypted_data = np.packbits(payload_bits).tobytes()
             
-            return encrypted_data, salt, nonce
+            return encrypted_data, salt, nonce, header_info['kdf_params']
             
         except Exception as e:
             raise StegoError(f"Failed to extract message: {str(e)}")
             
+    def _lsb_values_to_bits(self, values: np.ndarray, lsb_bits: int, 
+                            bit_count: int) -> np.ndarray:
+        """Expand lsb_bits-wide uint8 values back into bit_count 0/1 bits (MSB first)"""
+        if lsb_bits == 1:
+            return values[:bit_count]
+            
+        bits = np.unpackbits(values.reshape(-1, 1), axis=1)[:, 8 - lsb_bits:]
+        return bits.reshape(-1)[:bit_count]
+        
+    def _header_size(self, version: int) -> int:
+        """Total header size in bytes (fields + CRC32) for a header version"""
+        return struct.calcsize(HEADER_FORMATS[version]) + 4
+        
+    def _header_crc(self, version: int, header_without_crc: bytes) -> int:
+        """Header checksum for a header version"""
+        if version == 1:
+            return calculate_crc32(header_without_crc)
+        return calculate_crc32c(header_without_crc)
+        
     def _create_header(self, salt: bytes, nonce: bytes, payload_length: int,
-                      lsb_bits: int, scatter: bool) -> bytes:
+                      lsb_bits: int, scatter: bool, kdf_params: dict) -> bytes:
         """Create steganography header"""
         try:
+            # Key derivation fields; the ones the KDF doesn't use stay 0
+            kdf = kdf_params['kdf']
+            if kdf not in KDF_IDS:
+                raise StegoError(f"Unsupported key derivation function: {kdf}")
+            iterations = kdf_params.get('iterations', 0)
+            scrypt_log_n = scrypt_r = scrypt_p = 0
+            if kdf == 'scrypt':
+                scrypt_log_n = kdf_params['n'].bit_length() - 1
+                if kdf_params['n'] != 1 << scrypt_log_n:
+                    raise StegoError(f"scrypt n must be a power of 2: {kdf_params['n']}")
+                scrypt_r = kdf_params['r']
+                scrypt_p = kdf_params['p']
+                
             # Create flags byte
             flags = lsb_bits & 0x03  # LSB bits in lower 2 bits
             if scatter:
                 flags |= 0x04  # Scatter flag in bit 2
                 
-            # Pack header structure
-            header = struct.pack(
-                '>4s B B 16s 12s I',
+            # Pack header structure and its CRC into one preallocated buffer
+            header = bytearray(self.header_size)
+            crc_offset = self.header_size - 4
+            struct.pack_into(
+                HEADER_FORMATS[self.version], header, 0,
                 self.magic_bytes,     # Magic bytes (4)
                 self.version,         # Version (1)
                 flags,               # Flags (1)
                 salt,                # Salt (16)
                 nonce,               # Nonce (12)
-                payload_length       # Payload length (4)
+                payload_length,      # Payload length (4)
+                KDF_IDS[kdf],        # KDF id (1)
+                iterations,          # PBKDF2 iterations (4)
+                scrypt_log_n,        # scrypt log2(n) (1)
+                scrypt_r,            # scrypt r (1)
+                scrypt_p             # scrypt p (1)
             )
             
-            # Calculate and append CRC32
-            crc32 = calculate_crc32(header)
-            header += struct.pack('>I', crc32)
+            # Calculate and append CRC
+            crc = self._header_crc(self.version, memoryview(header)[:crc_offset])
+            struct.pack_into('>I', header, crc_offset, crc)
             
-            return header
+            return bytes(header)
             
         except Exception as e:
             raise StegoError(f"Failed to create header: {str(e)}")
@@ -256,31 +567,37 @@ class StegoService:
     def _parse_header(self, header_bytes: bytes) -> dict:
         """Parse steganography header"""
         try:
-            if len(header_bytes) < self.header_size:
+            if len(header_bytes) < self._header_size(1):
+                raise StegoError("Header too short")
+                
+            # Verify magic bytes
+            if header_bytes[:4] != self.magic_bytes:
+                raise StegoError("Invalid magic bytes - file not encoded with this tool")
+                
+            # Verify version; it determines the header layout and size
+            version = header_bytes[4]
+            if version not in HEADER_FORMATS:
+                raise StegoError(f"Unsupported version: {version}")
+                
+            header_size = self._header_size(version)
+            if len(header_bytes) < header_size:
                 raise StegoError("Header too short")
                 
             # Extract header without CRC
-            header_without_crc = header_bytes[:-4]
+            header_without_crc = header_bytes[:header_size - 4]
             
-            # Verify CRC32
-            expected_crc = calculate_crc32(header_without_crc)
-            actual_crc = struct.unpack('>I', header_bytes[-4:])[0]
+            # Verify CRC (CRC32 for version 1, CRC-32C from version 2)
+            expected_crc = self._header_crc(version, header_without_crc)
+            actual_crc = struct.unpack('>I', header_bytes[header_size - 4:header_size])[0]
             
             if expected_crc != actual_crc:
                 raise StegoError("Header CRC verification failed")
                 
             # Unpack header
-            magic, version, flags, salt, nonce, payload_length = struct.unpack(
-                '>4s B B 16s 12s I', header_without_crc
-            )
-            
-            # Verify magic bytes
-            if magic != self.magic_bytes:
-                raise StegoError("Invalid magic bytes - file not encoded with this tool")
-                
-            # Verify version
-            if version != self.version:
-                raise StegoError(f"Unsupported version: {version}")
+            fields = struct.unpack(HEADER_FORMATS[version], header_without_crc)
+            magic, version, flags, salt, nonce, payload_length = fields[:6]
+            kdf_params = self._parse_kdf_fields(fields[6:]) if version >= 2 else \
+                {'kdf': 'pbkdf2', 'iterations': LEGACY_ITERATIONS}
                 
             # Parse flags
             lsb_bits = flags & 0x03
@@ -291,11 +608,13 @@ class StegoService:
                 
             return {
                 'version': version,
+                'header_size': header_size,
                 'lsb_bits': lsb_bits,
                 'scatter': scatter,
                 'salt': salt,
                 'nonce': nonce,
-                'payload_length': payload_length
+                'payload_length': payload_length,
+                'kdf_params': kdf_params
             }
             
         except struct.error as e:
@@ -303,8 +622,27 @@ class StegoService:
         except Exception as e:
             raise StegoError(f"Failed to parse header: {str(e)}")
             
+    def _parse_kdf_fields(self, fields: tuple) -> dict:
+        """Turn the (kdf id, iterations, log2 n, r, p) header fields into kdf_params"""
+        kdf_id, iterations, scrypt_log_n, scrypt_r, scrypt_p = fields
+        kdf = KDF_NAMES.get(kdf_id)
+        
+        if kdf == 'pbkdf2':
+            if iterations == 0:
+                raise StegoError("Invalid PBKDF2 iteration count: 0")
+            return {'kdf': kdf, 'iterations': iterations}
+            
+        if kdf == 'scrypt':
+            if not 1 <= scrypt_log_n <= 32 or scrypt_r == 0 or scrypt_p == 0:
+                raise StegoError(
+                    f"Invalid scrypt parameters: n=2^{scrypt_log_n}, r={scrypt_r}, p={scrypt_p}"
+                )
+            return {'kdf': kdf, 'n': 1 << scrypt_log_n, 'r': scrypt_r, 'p': scrypt_p}
+            
+        raise StegoError(f"Unsupported key derivation id: {kdf_id}")
+        
     def _generate_scatter_indices(self, count: int, total_samples: int, 
-                                 salt: bytes) -> list:
+                                 salt: bytes, version: int) -> np.ndarray:
         """
         Generate pseudo-random indices for bit scattering
         
@@ -312,30 +650,57 @@ class StegoService:
             count: Number of indices needed
             total_samples: Total number of samples available
             salt: Salt for PRNG seeding
+            version: Header version of the file; version 1 files were
+                     scattered with Python's random.shuffle
             
         Returns:
-            List of sample indices
+            Array of sample indices
         """
         try:
-            # Create deterministic seed from salt
-            seed_data = salt + b"scatter"
-            seed = int.from_bytes(hashlib.sha256(seed_data).digest()[:4], 'big')
-            
-            # Use random generator with fixed seed
-            rng = random.Random(seed)
-            
             # Generate unique random indices
             if count > total_samples:
                 raise StegoError("Not enough samples for scatter pattern")
                 
-            indices = list(range(total_samples))
-            rng.shuffle(indices)
-            
-            return indices[:count]
+            if version == 1:
+                # Create deterministic seed from salt
+                seed_data = salt + b"scatter"
+                seed = int.from_bytes(hashlib.sha256(seed_data).digest()[:4], 'big')
+                
+                # Use random generator with fixed seed
+                rng = random.Random(seed)
+                indices = list(range(total_samples))
+                rng.shuffle(indices)
+                
+                return np.asarray(indices[:count], dtype=np.intp)
+                
+            # Index i maps to the image of i under a keyed permutation of
+            # [0, total_samples), so only count indices are ever computed
+            return feistel_indices(np.arange(count, dtype=np.uint64),
+                                   scatter_round_keys(salt), total_samples)
             
         except Exception as e:
             raise StegoError(f"Failed to generate scatter indices: {str(e)}")
             
+    def _count_lsb_ones(self, flat_audio: np.ndarray) -> int:
+        """
+        Count samples whose least significant bit is set
+        
+        For multi-byte integer samples only the low-order byte of each sample
+        is read (through a uint8 view), so the AND temporary is one byte per
+        sample instead of a full-width copy of the buffer.
+        """
+        dtype = flat_audio.dtype
+        if dtype.kind not in 'iu' or not flat_audio.flags.c_contiguous:
+            return int(np.count_nonzero(flat_audio & 1))
+            
+        little_endian = dtype.byteorder == '<' or (
+            dtype.byteorder in '=|' and sys.byteorder == 'little'
+        )
+        low_byte = 0 if little_endian else dtype.itemsize - 1
+        lsb_bytes = flat_audio.view(np.uint8)[low_byte::dtype.itemsize]
+        
+        return int(np.count_nonzero(lsb_bytes & 1))
+        
     def analyze_audio_for_stego(self, audio_data: np.ndarray) -> dict:
         """
         Analyze audio for potential steganography presence
@@ -348,28 +713,19 @@ class StegoService:
         """
         try:
             # Basic analysis
-            flat_audio = audio_data.flatten()
+            flat_audio = audio_data.ravel()
             
             # Check LSB distribution
-            lsb_ones = np.sum(flat_audio & 1)
+            lsb_ones = self._count_lsb_ones(flat_audio)
             lsb_zeros = len(flat_audio) - lsb_ones
             lsb_ratio = lsb_ones / len(flat_audio) if len(flat_audio) > 0 else 0
             
-            # Check for header magic bytes
+            # Check for header magic bytes (only the first 32 LSBs are needed)
+            magic_bits = len(self.magic_bytes) * 8
             has_header = False
-            try:
-                header_bits = []
-                for i in range(min(self.header_size * 8, len(flat_audio))):
-                    bit = flat_audio[i] & 1
-                    header_bits.append(bit)
-                    
-                if len(header_bits) >= 32:  # At least magic bytes
-                    bit_packer = BitPacker()
-                    header_start = bit_packer.bits_to_bytes(header_bits[:32])
-                    if header_start.startswith(self.magic_bytes):
-                        has_header = True
-            except:
-                pass
+            if len(flat_audio) >= magic_bits:
+                magic_lsb = (flat_audio[:magic_bits] & 1).astype(np.uint8)
+                has_header = np.packbits(magic_lsb).tobytes() == self.magic_bytes
                 
             return {
                 'total_samples': len(flat_audio),
@@ -377,7 +733,7 @@ class StegoService:
                 'lsb_distribution_suspicious': abs(lsb_ratio - 0.5) < 0.01,
                 'has_stego_header': has_header,
                 'estimated_capacity_1lsb': len(flat_audio) // 8 - self.header_size,
-                'estimated_capacity_2lsb': len(flat_audio) // 4 - self.header_size
+                'estimated_capacity_2lsb': (len(flat_audio) - self.header_size * 8) // 4
             }
             
         except Exception as e:
@@ -161,22 +161,23 @@ class DecodeTab:
         """Worker thread for decoding"""
         try:
             # Load audio
-            self.frame.after(0, lambda: self.status_bar.set_status("Loading audio file..."))
-            audio_data, sample_rate = self.audio_service.load_audio(input_file)
+            self.frame.after(0, self.status_bar.set_status, "Loading audio file...")
+            audio_data, sample_rate, _ = self.audio_service.load_audio_interleaved(input_file)
             
             # Extract encrypted data
-            self.frame.after(0, lambda: self.status_bar.set_status("Extracting hidden data..."))
-            encrypted_data, salt, nonce = self.stego_service.extract_message(audio_data)
+            self.frame.after(0, self.status_bar.set_status, "Extracting hidden data...")
+            encrypted_data, salt, nonce, kdf_params = self.stego_service.extract_message(audio_data)
             
             # Decrypt message
-            self.frame.after(0, lambda: self.status_bar.set_status("Decrypting message..."))
-            message = self.crypto_service.decrypt_message(encrypted_data, password, salt, nonce)
+            self.frame.after(0, self.status_bar.set_status, "Decrypting message...")
+            message = self.crypto_service.decrypt_message(encrypted_data, password, salt, nonce,
+                                                          kdf_params=kdf_params)
             
             # Success
-            self.frame.after(0, lambda: self.decoding_complete(message, None))
+            self.frame.after(0, self.decoding_complete, message, None)
             
         except Exception as e:
-            self.frame.after(0, lambda: self.decoding_complete(None, str(e)))
+            self.frame.after(0, self.decoding_complete, None, str(e))
             
     def decoding_complete(self, message, error):
         """Handle decoding completion"""
@@ -5,7 +5,11 @@ Encode tab for hiding messages in audio files
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
+import queue
 import os
+import platform
+import subprocess
+from stat import S_ISREG
 
 from widgets import (ModernFrame, ModernButton, ModernLabel, ModernText, 
                     PasswordEntry, FileSelector, ModernProgressBar, CardFrame,
@@ -20,6 +24,16 @@ from utils.password_generator import generate_secure_password
 class EncodeTab:
     """Tab for encoding messages into audio files"""
     
+    # Bytes embedded on top of the UTF-8 message: the AES-GCM tag. The
+    # header is already excluded from the capacity the stego service reports
+    _OVERHEAD = 16
+    
+    # How often the UI picks up encode worker status (10 Hz)
+    WORKER_POLL_MS = 100
+    
+    # How often the UI checks whether preview playback has ended
+    PLAYBACK_POLL_MS = 250
+    
     def __init__(self, parent):
         self.parent = parent
         self.frame = ModernFrame(parent)
@@ -33,6 +47,34 @@ class EncodeTab:
         self.encoding = False
         self.current_capacity = 0
         
+        # Decoded audio for the selected file, keyed by (path, mtime, size).
+        # It backs preview playback and the non-WAV encode path; capacity is
+        # read from the header and WAV encodes stream from the file.
+        self._audio_cache = {}
+        self._audio_cache_lock = threading.Lock()
+        
+        # Latest status text and (bytes_done, bytes_total) posted by the
+        # encode worker, picked up by _poll_worker on the Tk thread
+        self._pending_status = None
+        self._pending_progress = None
+        self._pending_lock = threading.Lock()
+        self._poll_after = None
+        self._playback_after = None
+        
+        # Long-lived worker thread for encode jobs, fed (func, args) tuples
+        self._jobs = queue.Queue()
+        threading.Thread(target=self._worker_loop, daemon=True,
+                         name="encode-worker").start()
+        
+        # Pending debounced callbacks: handler name -> Tk after id
+        self._pending_after = {}
+        
+        # File manager command used to open the output folder
+        self._open_cmd = {
+            'Windows': ['explorer'],
+            'Darwin': ['open']
+        }.get(platform.system(), ['xdg-open'])
+        
         self.setup_ui()
         
     def setup_ui(self):
@@ -73,7 +115,7 @@ class EncodeTab:
             ]
         )
         self.file_selector.grid(row=1, column=0, sticky="ew", pady=(0, 15))
-        self.file_selector.entry.bind('<KeyRelease>', self.on_file_changed)
+        self.file_selector.entry.bind('<KeyRelease>', self._debounced(self.on_file_changed, 200))
         
         # Message input
         ModernLabel(content_frame, text="Secret Message:", 
@@ -81,7 +123,7 @@ class EncodeTab:
         
         self.message_text = ModernText(content_frame, height=8)
         self.message_text.grid(row=3, column=0, sticky="nsew", pady=(0, 15))
-        self.message_text.bind('<KeyRelease>', self.on_message_changed)
+        self.message_text.bind('<KeyRelease>', self._debounced(self.on_message_changed, 100))
         
         # Auto-generated password section
         password_frame = ModernFrame(content_frame)
@@ -157,8 +199,15 @@ class EncodeTab:
         )
         self.volume_scale.grid(row=2, column=1, sticky="ew", pady=(10, 0))
         
+        # Push volume changes straight to the playback stream
+        self.volume_var.trace_add(
+            'write', lambda *_: self.audio_service.set_gain(self.volume_var.get() / 100.0)
+        )
+        self.audio_service.set_gain(self.volume_var.get() / 100.0)
+        
         # Player variables
         self.current_audio = None
+        self.current_audio_path = None
         self.is_playing = False
         
         # Options frame
@@ -205,18 +254,38 @@ class EncodeTab:
         # Generate initial password after UI is complete
         self.generate_new_password()
         
+    def _debounced(self, handler, delay_ms):
+        """
+        Wrap an event handler so a burst of events runs it only once,
+        delay_ms after the last event
+        """
+        def schedule(event=None):
+            pending = self._pending_after.pop(handler.__name__, None)
+            if pending is not None:
+                self.frame.after_cancel(pending)
+            self._pending_after[handler.__name__] = self.frame.after(delay_ms, run)
+            
+        def run():
+            self._pending_after.pop(handler.__name__, None)
+            handler()
+            
+        return schedule
+        
     def on_file_changed(self, event=None):
         """Handle file selection change"""
         file_path = self.file_selector.get()
-        if file_path and os.path.exists(file_path):
+        if file_path and self._stat_file(file_path):
             try:
-                # Calculate capacity
+                # Calculate capacity from the file header only; the samples
+                # are decoded on first playback or when encoding starts
                 self.current_capacity = self.stego_service.calculate_capacity(file_path)
                 self.update_capacity_display()
                 
-                # Load audio for playback
-                self.load_audio_for_playback(file_path)
-                self.status_bar.set_status("Audio file loaded successfully")
+                # Playback loads the audio lazily
+                self.current_audio = None
+                self.current_audio_path = file_path
+                self.enable_playback()
+                self.status_bar.set_status("Audio file selected")
             except Exception as e:
                 self.current_capacity = 0
                 self.capacity_label.configure(text="Capacity: Error")
@@ -231,16 +300,32 @@ class EncodeTab:
         """Handle message text change"""
         self.update_capacity_display()
         
+    def _message_size(self):
+        """
+        UTF-8 byte length of the stripped message, measured inside Tk
+        
+        Searching and counting in the Text widget avoids copying the whole
+        buffer into Python on every keystroke; the text is only fetched
+        when it contains non-ASCII characters.
+        """
+        text = self.message_text
+        start = text.search(r'\S', '1.0', 'end', regexp=True)
+        if not start:
+            return 0
+        end = text.search(r'\S', 'end', '1.0', regexp=True, backwards=True) + '+1c'
+        
+        if text.search(r'[^\x01-\x7f]', start, end, regexp=True):
+            return len(text.get(start, end).encode('utf-8'))
+        return int(text.tk.call(text._w, 'count', '-chars', start, end))
+        
+    def _required_bytes(self, message_size):
+        """Capacity needed to embed a message of message_size UTF-8 bytes"""
+        return message_size + self._OVERHEAD
+        
     def update_capacity_display(self):
         """Update the capacity display"""
         if self.current_capacity > 0:
-            message = self.message_text.get("1.0", tk.END).strip()
-            message_size = len(message.encode('utf-8'))
-            
-            # Add overhead for encryption and header
-            encrypted_size = message_size + 32  # Approximate overhead
-            header_size = 42  # Header size from spec
-            total_needed = encrypted_size + header_size
+            total_needed = self._required_bytes(self._message_size())
             
             if total_needed <= self.current_capacity:
                 color = "green"
@@ -263,7 +348,8 @@ class EncodeTab:
             
         # Validate inputs
         file_path = self.file_selector.get()
-        if not file_path or not os.path.exists(file_path):
+        file_stat = self._stat_file(file_path) if file_path else None
+        if not file_stat:
             messagebox.showerror("Error", "Please select a valid audio file")
             return
             
@@ -277,12 +363,12 @@ class EncodeTab:
             messagebox.showerror("Error", "Please enter a password")
             return
             
+        # Encode once; the capacity check and the worker both use the bytes
+        message_bytes = message.encode('utf-8')
+        
         # Check capacity
-        message_size = len(message.encode('utf-8'))
         if self.current_capacity > 0:
-            encrypted_size = message_size + 32
-            header_size = 42
-            total_needed = encrypted_size + header_size
+            total_needed = self._required_bytes(len(message_bytes))
             
             if total_needed > self.current_capacity:
                 messagebox.showerror(
@@ -302,92 +388,175 @@ class EncodeTab:
         if not output_file:
             return
             
-        # Start encoding in background thread
+        # Hand the job to the background worker thread
         self.encoding = True
         self.encode_btn.configure(state='disabled', text="Encoding...")
-        self.progress_bar.configure(mode='indeterminate')
-        self.progress_bar.start()
+        self.progress_bar.configure(maximum=100, value=0)
         self.status_bar.set_status("Encoding message...")
         
-        thread = threading.Thread(
-            target=self.encode_worker,
-            args=(file_path, message, password, output_file),
-            daemon=True
-        )
-        thread.start()
+        self._jobs.put((self.encode_worker,
+                        (file_path, file_stat, message_bytes, password, output_file)))
+        self._poll_after = self.frame.after(self.WORKER_POLL_MS, self._poll_worker)
         
-    def encode_worker(self, input_file, message, password, output_file):
+    def _worker_loop(self):
+        """Run queued jobs one at a time on the tab's worker thread"""
+        while True:
+            func, args = self._jobs.get()
+            try:
+                func(*args)
+            except Exception:
+                # Jobs report their own errors through after(); keep serving
+                pass
+                
+    def encode_worker(self, input_file, file_stat, message_bytes, password, output_file):
         """Worker thread for encoding"""
         try:
-            # Load and convert audio
-            self.frame.after(0, lambda: self.status_bar.set_status("Loading audio file..."))
-            audio_data, sample_rate = self.audio_service.load_audio(input_file)
-            
-            # Encrypt message
-            self.frame.after(0, lambda: self.status_bar.set_status("Encrypting message..."))
-            encrypted_data, salt, nonce = self.crypto_service.encrypt_message(message, password)
-            
-            # Embed in audio
-            self.frame.after(0, lambda: self.status_bar.set_status("Hiding message in audio..."))
-            encoded_audio = self.stego_service.embed_message(
-                audio_data, 
-                encrypted_data, 
-                salt, 
-                nonce,
-                scatter=self.scatter_var.get()
-            )
+            # Start key derivation + encryption; it runs on the crypto
+            # worker while the audio file is being read
+            encryption = self.crypto_service.encrypt_message_async(message_bytes, password)
             
-            # Save output
-            self.frame.after(0, lambda: self.status_bar.set_status("Saving encoded audio..."))
-            self.audio_service.save_audio(encoded_audio, sample_rate, output_file)
+            kdf_params = self.crypto_service.kdf_params
+            scatter = self.scatter_var.get()
+            progress_cb = lambda done, total: self._post_worker_state(progress=(done, total))
+            
+            if os.path.splitext(input_file)[1].lower() == '.wav':
+                # The WAV header gives the exact sample count the scatter
+                # needs, so the file is embedded and written block by block
+                # instead of being decoded in full
+                info = self.audio_service.get_audio_info(input_file)
+                
+                self._post_worker_state(status="Encrypting message...")
+                encrypted_data, salt, nonce = encryption.result()
+                
+                self._post_worker_state(status="Hiding message in audio...")
+                blocks = self.stego_service.embed_stream(
+                    self.audio_service.iter_chunks(input_file),
+                    info['frames'] * info['channels'],
+                    encrypted_data,
+                    salt,
+                    nonce,
+                    kdf_params,
+                    scatter=scatter,
+                    progress_cb=progress_cb
+                )
+                
+                # Nothing here reads the decoded copy cached for playback, so
+                # drop it before the output (possibly this same file) is written
+                self._forget_audio(input_file)
+                self.audio_service.save_audio_stream(blocks, info['sample_rate'], output_file,
+                                                     info['channels'])
+            else:
+                # Load and convert audio (reuses the copy decoded on file selection)
+                self._post_worker_state(status="Loading audio file...")
+                audio_data, sample_rate, channels = self._get_audio(input_file, file_stat)
+                
+                # Encrypt message
+                self._post_worker_state(status="Encrypting message...")
+                encrypted_data, salt, nonce = encryption.result()
+                
+                # Embed in audio
+                self._post_worker_state(status="Hiding message in audio...")
+                encoded_audio = self.stego_service.embed_message(
+                    audio_data, 
+                    encrypted_data, 
+                    salt, 
+                    nonce,
+                    kdf_params,
+                    scatter=scatter,
+                    progress_cb=progress_cb
+                )
+                
+                # Drop the inputs before saving; the decoded audio stays alive
+                # only through the playback cache, unless it is being replaced
+                del audio_data, encrypted_data
+                if os.path.abspath(output_file) == os.path.abspath(input_file):
+                    self._forget_audio(input_file)
+                
+                # Save output
+                self._post_worker_state(status="Saving encoded audio...")
+                self.audio_service.save_audio(encoded_audio, sample_rate, output_file,
+                                              channels=channels)
+                del encoded_audio
             
             # Success
-            self.frame.after(0, lambda: self.encoding_complete(output_file, None))
+            self.frame.after(0, self.encoding_complete, output_file, None)
             
         except Exception as e:
-            self.frame.after(0, lambda: self.encoding_complete(None, str(e)))
+            self.frame.after(0, self.encoding_complete, None, str(e))
+            
+    def _post_worker_state(self, status=None, progress=None):
+        """Record worker status/progress for the next _poll_worker (any thread)"""
+        with self._pending_lock:
+            if status is not None:
+                self._pending_status = status
+            if progress is not None:
+                self._pending_progress = progress
+                
+    def _poll_worker(self):
+        """Apply the latest worker state on the Tk thread and reschedule"""
+        with self._pending_lock:
+            status, self._pending_status = self._pending_status, None
+            progress, self._pending_progress = self._pending_progress, None
+            
+        if status is not None:
+            self.status_bar.set_status(status)
+        if progress is not None:
+            self._update_progress(*progress)
+            
+        self._poll_after = self.frame.after(self.WORKER_POLL_MS, self._poll_worker)
+        
+    def _update_progress(self, bytes_done, bytes_total):
+        """Show embedding progress reported by the stego service"""
+        if bytes_total:
+            self.progress_bar.configure(value=bytes_done * 100 / bytes_total)
             
     def encoding_complete(self, output_file, error):
         """Handle encoding completion"""
         self.encoding = False
+        if self._poll_after is not None:
+            self.frame.after_cancel(self._poll_after)
+            self._poll_after = None
+        with self._pending_lock:
+            self._pending_status = None
+            self._pending_progress = None
         self.encode_btn.configure(state='normal', text="Hide Message")
-        self.progress_bar.stop()
-        self.progress_bar.configure(mode='determinate', value=0)
+        self.progress_bar.configure(value=0)
         
         if error:
             self.status_bar.set_status(f"Encoding failed: {error}")
             messagebox.showerror("Encoding Failed", f"Failed to encode message:\n{error}")
         else:
             self.status_bar.set_status("Message encoded successfully!")
-            result = messagebox.showinfo(
+            
+            # Optionally open output folder
+            if messagebox.askyesno(
                 "Success", 
                 f"Message successfully hidden in audio!\n\nSaved to: {output_file}\n\n"
                 "Would you like to open the output folder?"
-            )
-            
-            # Optionally open output folder
-            if messagebox.askyesno("Open Folder", "Open the output folder?"):
-                import subprocess
-                import platform
-                
+            ):
+                # Popen: don't block the UI until the file manager exits
                 folder_path = os.path.dirname(output_file)
-                if platform.system() == "Windows":
-                    subprocess.run(["explorer", folder_path])
-                elif platform.system() == "Darwin":  # macOS
-                    subprocess.run(["open", folder_path])
-                else:  # Linux
-                    subprocess.run(["xdg-open", folder_path])
+                subprocess.Popen(self._open_cmd + [folder_path])
                     
     def generate_new_password(self):
-        """Generate a new secure password"""
+        """Generate a new secure password on a worker thread"""
+        threading.Thread(target=self._generate_password_worker, daemon=True).start()
+        
+    def _generate_password_worker(self):
+        """Worker thread for password generation; results go back via after()"""
         try:
             new_password = generate_secure_password(16)
-            self.password_entry.delete(0, tk.END)
-            self.password_entry.insert(0, new_password)
-            if hasattr(self, 'status_bar'):
-                self.status_bar.set_status("New password generated")
+            self.frame.after(0, self._apply_password, new_password)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate password: {str(e)}")
+            self.frame.after(0, messagebox.showerror,
+                             "Error", f"Failed to generate password: {str(e)}")
+            
+    def _apply_password(self, new_password):
+        """Show a newly generated password (runs on the Tk thread)"""
+        self.password_entry.delete(0, tk.END)
+        self.password_entry.insert(0, new_password)
+        if hasattr(self, 'status_bar'):
+            self.status_bar.set_status("New password generated")
             
     def copy_password(self):
         """Copy password to clipboard"""
@@ -404,11 +573,69 @@ class EncodeTab:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to copy password: {str(e)}")
             
+    def _stat_file(self, file_path):
+        """
+        Stat file_path, checking that it is a regular file
+        
+        Returns:
+            The os.stat_result, or None if the path is not a regular file
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+            
+        if not S_ISREG(stat.st_mode):
+            return None
+            
+        return stat
+        
+    def _get_audio(self, file_path, stat=None):
+        """
+        Return (audio_data, sample_rate, channels) for a file, decoding it
+        only if it is not cached or has changed on disk since it was cached
+        
+        A stat result the caller already holds can be passed in to skip
+        stat()ing the file again.
+        """
+        if stat is None:
+            stat = os.stat(file_path)
+        cache_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        
+        with self._audio_cache_lock:
+            cached = self._audio_cache.get(cache_key)
+            if cached is not None:
+                return cached
+                
+            audio = self.audio_service.load_audio_interleaved(file_path)
+            
+            # Keep only the most recent file; decoded audio can be large
+            self._audio_cache.clear()
+            self._audio_cache[cache_key] = audio
+            return audio
+            
+    def _forget_audio(self, file_path):
+        """
+        Drop the decoded copy of file_path from the cache and from playback
+        (any thread)
+        
+        Playback reloads the file lazily on the next play.
+        """
+        abs_path = os.path.abspath(file_path)
+        with self._audio_cache_lock:
+            for cache_key in [key for key in self._audio_cache if key[0] == abs_path]:
+                del self._audio_cache[cache_key]
+        self.frame.after(0, self._release_playback_audio, file_path)
+        
+    def _release_playback_audio(self, file_path):
+        """Forget the loaded playback samples if they belong to file_path"""
+        if self.current_audio_path == file_path:
+            self.current_audio = None
+            
     def load_audio_for_playback(self, file_path):
         """Load audio file for playback"""
         try:
-            audio_data, sample_rate = self.audio_service.load_audio(file_path)
-            self.current_audio = (audio_data, sample_rate)
+            self.current_audio = self._get_audio(file_path)
             self.enable_playback()
         except Exception as e:
             self.disable_playback()
@@ -425,11 +652,12 @@ class EncodeTab:
         self.play_btn.configure(state='disabled', text="▶ Play")
         self.stop_btn.configure(state='disabled')
         self.current_audio = None
+        self.current_audio_path = None
         self.is_playing = False
         
     def toggle_playback(self):
         """Toggle audio playback"""
-        if not self.current_audio:
+        if not (self.current_audio or self.current_audio_path):
             return
             
         if self.is_playing:
@@ -441,23 +669,51 @@ class EncodeTab:
         """Start audio playback"""
         try:
             if not self.current_audio:
-                return
+                if not self.current_audio_path:
+                    return
+                self.status_bar.set_status("Loading audio file...")
+                self.load_audio_for_playback(self.current_audio_path)
                 
-            audio_data, sample_rate = self.current_audio
-            volume = self.volume_var.get() / 100.0
+            audio_data, sample_rate, channels = self.current_audio
             
-            self.audio_service.start_playback(audio_data, sample_rate, volume)
+            # Volume is already set on the service by the volume_var trace
+            self.audio_service.start_playback(audio_data, sample_rate, channels=channels)
             
             self.is_playing = True
             self.play_btn.configure(text="⏸ Pause")
             self.status_bar.set_status("Playing audio...")
+            self._watch_playback()
             
         except Exception as e:
             messagebox.showerror("Playback Error", f"Failed to start playback:\n{str(e)}")
             
+    def _watch_playback(self):
+        """Reset the controls once playback ends and report a failed stream"""
+        self._playback_after = None
+        if not self.is_playing:
+            return
+        if self.audio_service.is_playing():
+            self._playback_after = self.frame.after(self.PLAYBACK_POLL_MS, self._watch_playback)
+            return
+            
+        self.is_playing = False
+        self.play_btn.configure(text="▶ Play")
+        error = self.audio_service.playback_error()
+        if error is not None:
+            self.status_bar.set_status(f"Playback failed: {str(error)}")
+        else:
+            self.status_bar.set_status("Playback finished")
+            
+    def _cancel_playback_watch(self):
+        """Stop polling for the end of playback"""
+        if self._playback_after is not None:
+            self.frame.after_cancel(self._playback_after)
+            self._playback_after = None
+            
     def pause_playback(self):
         """Pause audio playback"""
         try:
+            self._cancel_playback_watch()
             self.audio_service.stop_playback()
             self.is_playing = False
             self.play_btn.configure(text="▶ Play")
@@ -468,6 +724,7 @@ class EncodeTab:
     def stop_playback(self):
         """Stop audio playback"""
         try:
+            self._cancel_playback_watch()
             self.audio_service.stop_playback()
             self.is_playing = False
             self.play_btn.configure(text="▶ Play")
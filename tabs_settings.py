@@ -7,10 +7,34 @@ from tkinter import ttk, filedialog, messagebox
 import json
 import os
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from widgets import (ModernFrame, ModernButton, ModernLabel, ModernEntry,
                     ModernCheckbutton, CardFrame, StatusBar)
 
 
+# Parsed settings files keyed by (path, mtime_ns), shared by all instances
+_settings_cache = {}
+
+
+def _loads(data: bytes):
+    """Parse settings JSON, with orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps(obj) -> bytes:
+    """Serialize settings as indented UTF-8 JSON, with orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode('utf-8')
+
+
 class SettingsTab:
     """Tab for application settings"""
     
@@ -37,8 +61,17 @@ class SettingsTab:
         # Load settings
         self.settings = self.load_settings()
         
-        self.setup_ui()
+        # The widgets are built the first time the tab is shown, so users
+        # who never open Settings don't pay for them at startup
+        self._built = False
+        self.parent.bind('<<NotebookTabChanged>>', self._on_tab_changed, add='+')
         
+    def _on_tab_changed(self, event=None):
+        """Build the UI on the first switch to this tab"""
+        if not self._built and self.parent.select() == str(self.frame):
+            self._built = True
+            self.setup_ui()
+            
     def setup_ui(self):
         """Setup the settings tab UI"""
         # Configure grid weights
@@ -258,8 +291,16 @@ Developed with Python, Tkinter, and industry-standard cryptography libraries."""
         """Load settings from file"""
         try:
             if os.path.exists(self.settings_file):
-                with open(self.settings_file, 'r') as f:
-                    settings = json.load(f)
+                # Reuse the parse while the file is unchanged on disk
+                cache_key = (os.path.abspath(self.settings_file),
+                             os.stat(self.settings_file).st_mtime_ns)
+                settings = _settings_cache.get(cache_key)
+                if settings is None:
+                    with open(self.settings_file, 'rb') as f:
+                        settings = _loads(f.read())
+                    _settings_cache.clear()
+                    _settings_cache[cache_key] = settings
+                    
                 # Merge with defaults to ensure all keys exist
                 merged_settings = self.default_settings.copy()
                 merged_settings.update(settings)
@@ -272,49 +313,54 @@ Developed with Python, Tkinter, and industry-standard cryptography libraries."""
     def save_settings(self):
         """Save current settings to file"""
         try:
-            # Validate LSB bits
-            try:
-                lsb_bits = int(self.lsb_bits_var.get())
-                if lsb_bits < 1 or lsb_bits > 2:
-                    raise ValueError("LSB bits must be 1 or 2")
-            except ValueError:
-                messagebox.showerror("Invalid Setting", "LSB bits must be 1 or 2")
-                return
-                
-            # Validate clipboard delay
-            try:
-                delay = int(self.clipboard_delay_var.get())
-                if delay < 1:
-                    raise ValueError("Delay must be positive")
-            except ValueError:
-                messagebox.showerror("Invalid Setting", "Clipboard clear delay must be a positive number")
-                return
-                
-            # Validate email port
-            try:
-                port = int(self.email_port_var.get())
-                if port < 1 or port > 65535:
-                    raise ValueError("Invalid port")
-            except ValueError:
-                messagebox.showerror("Invalid Setting", "Email port must be between 1 and 65535")
-                return
+            # Validate the numeric fields: (key, variable, min, max, error)
+            numeric_fields = (
+                ("lsb_bits", self.lsb_bits_var, 1, 2, "LSB bits must be 1 or 2"),
+                ("clipboard_clear_delay", self.clipboard_delay_var, 1, None,
+                 "Clipboard clear delay must be a positive number"),
+                ("email_port", self.email_port_var, 1, 65535,
+                 "Email port must be between 1 and 65535"),
+            )
+            
+            parsed = {}
+            for key, var, low, high, error in numeric_fields:
+                try:
+                    value = int(var.get())
+                except ValueError:
+                    value = None
+                if value is None or value < low or (high is not None and value > high):
+                    messagebox.showerror("Invalid Setting", error)
+                    return
+                parsed[key] = value
                 
             # Collect settings
             self.settings = {
                 "default_output_folder": self.output_folder_var.get(),
-                "lsb_bits": lsb_bits,
+                "lsb_bits": parsed["lsb_bits"],
                 "scatter_enabled": self.scatter_var.get(),
                 "auto_clear_clipboard": self.auto_clear_var.get(),
-                "clipboard_clear_delay": delay,
+                "clipboard_clear_delay": parsed["clipboard_clear_delay"],
                 "email_server": self.email_server_var.get(),
-                "email_port": port,
+                "email_port": parsed["email_port"],
                 "email_address": self.email_address_var.get(),
                 "email_use_tls": self.email_tls_var.get()
             }
             
-            # Save to file
-            with open(self.settings_file, 'w') as f:
-                json.dump(self.settings, f, indent=2)
+            # Save to file: one write to a temporary file, flushed to disk and
+            # swapped into place, so a crash never leaves a half-written file
+            data = _dumps(self.settings)
+            temp_path = f"{self.settings_file}.tmp"
+            try:
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.settings_file)
+                _settings_cache.clear()
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
                 
             self.status_bar.set_status("Settings saved successfully!")
             messagebox.showinfo("Success", "Settings saved successfully!")
@@ -3,31 +3,55 @@ Theme and styling configuration for the Audio Steganography application
 """
 
 import tkinter as tk
+import tkinter.font as tkfont
 from tkinter import ttk
 
 
-# Color scheme
+# Color scheme, as module constants so hot paths skip the dict lookup
+PRIMARY = '#106EBE'      # Blue
+ACCENT = '#0FFCBE'       # Mint
+BG_DARK = '#1a1a1a'      # Dark background
+BG_MEDIUM = '#2d2d2d'    # Medium background
+BG_LIGHT = '#404040'     # Light background
+TEXT_LIGHT = '#ffffff'   # White text
+TEXT_MEDIUM = '#cccccc'  # Light gray text
+TEXT_DARK = '#666666'    # Dark gray text
+SUCCESS = '#28a745'      # Green
+WARNING = '#ffc107'      # Yellow
+ERROR = '#dc3545'        # Red
+BORDER = '#555555'       # Border color
+
+# Name -> color, for get_color and existing callers
 COLORS = {
-    'primary': '#106EBE',      # Blue
-    'accent': '#0FFCBE',       # Mint
-    'bg_dark': '#1a1a1a',      # Dark background
-    'bg_medium': '#2d2d2d',    # Medium background
-    'bg_light': '#404040',     # Light background
-    'text_light': '#ffffff',   # White text
-    'text_medium': '#cccccc',  # Light gray text
-    'text_dark': '#666666',    # Dark gray text
-    'success': '#28a745',      # Green
-    'warning': '#ffc107',      # Yellow
-    'error': '#dc3545',        # Red
-    'border': '#555555'        # Border color
+    'primary': PRIMARY,
+    'accent': ACCENT,
+    'bg_dark': BG_DARK,
+    'bg_medium': BG_MEDIUM,
+    'bg_light': BG_LIGHT,
+    'text_light': TEXT_LIGHT,
+    'text_medium': TEXT_MEDIUM,
+    'text_dark': TEXT_DARK,
+    'success': SUCCESS,
+    'warning': WARNING,
+    'error': ERROR,
+    'border': BORDER
 }
 
+# Named Tk fonts, created once by setup_theme. tkfont.Font deletes its Tk
+# font when garbage collected, so the objects are kept alive here.
+FONTS = {}
+
 
 def setup_theme(root):
     """Setup the application theme and ttk styles"""
     
     # Configure root window
-    root.configure(bg=COLORS['bg_dark'])
+    root.configure(bg=BG_DARK)
+    
+    # Resolve each font once; styles and widgets share the named fonts
+    FONTS['base'] = tkfont.Font(root, family='Segoe UI', size=10)
+    FONTS['bold'] = tkfont.Font(root, family='Segoe UI', size=10, weight='bold')
+    FONTS['heading'] = tkfont.Font(root, family='Segoe UI', size=12, weight='bold')
     
     # Create style object
     style = ttk.Style()
@@ -36,128 +60,128 @@ def setup_theme(root):
     style.theme_use('clam')
     
     style.configure('TNotebook', 
-                   background=COLORS['bg_dark'],
+                   background=BG_DARK,
                    borderwidth=0)
     
     style.configure('TNotebook.Tab',
-                   background=COLORS['bg_medium'],
-                   foreground=COLORS['text_light'],
+                   background=BG_MEDIUM,
+                   foreground=TEXT_LIGHT,
                    padding=[20, 10],
                    borderwidth=1)
     
     style.map('TNotebook.Tab',
-             background=[('selected', COLORS['primary']),
-                        ('active', COLORS['bg_light'])],
-             foreground=[('selected', COLORS['text_light'])])
+             background=[('selected', PRIMARY),
+                        ('active', BG_LIGHT)],
+             foreground=[('selected', TEXT_LIGHT)])
     
     # Configure frames
     style.configure('Modern.TFrame',
-                   background=COLORS['bg_dark'],
+                   background=BG_DARK,
                    relief='flat',
                    borderwidth=0)
     
     style.configure('Card.TFrame',
-                   background=COLORS['bg_medium'],
+                   background=BG_MEDIUM,
                    relief='flat',
                    borderwidth=1)
     
     # Configure labels
     style.configure('Modern.TLabel',
-                   background=COLORS['bg_dark'],
-                   foreground=COLORS['text_light'],
-                   font=('Segoe UI', 10))
+                   background=BG_DARK,
+                   foreground=TEXT_LIGHT,
+                   font=FONTS['base'])
     
     style.configure('Heading.TLabel',
-                   background=COLORS['bg_dark'],
-                   foreground=COLORS['text_light'],
-                   font=('Segoe UI', 12, 'bold'))
+                   background=BG_DARK,
+                   foreground=TEXT_LIGHT,
+                   font=FONTS['heading'])
     
     style.configure('Card.TLabel',
-                   background=COLORS['bg_medium'],
-                   foreground=COLORS['text_light'],
-                   font=('Segoe UI', 10))
+                   background=BG_MEDIUM,
+                   foreground=TEXT_LIGHT,
+                   font=FONTS['base'])
     
     # Configure buttons
     style.configure('Modern.TButton',
-                   background=COLORS['primary'],
-                   foreground=COLORS['text_light'],
-                   font=('Segoe UI', 10),
+                   background=PRIMARY,
+                   foreground=TEXT_LIGHT,
+                   font=FONTS['base'],
                    padding=[20, 10],
                    relief='flat',
                    borderwidth=0)
     
     style.map('Modern.TButton',
-             background=[('active', COLORS['accent']),
-                        ('pressed', COLORS['bg_light'])])
+             background=[('active', ACCENT),
+                        ('pressed', BG_LIGHT)])
     
     style.configure('Accent.TButton',
-                   background=COLORS['accent'],
-                   foreground=COLORS['bg_dark'],
-                   font=('Segoe UI', 10, 'bold'),
+                   background=ACCENT,
+                   foreground=BG_DARK,
+                   font=FONTS['bold'],
                    padding=[20, 10],
                    relief='flat',
                    borderwidth=0)
     
     style.map('Accent.TButton',
-             background=[('active', COLORS['primary']),
-                        ('pressed', COLORS['bg_light'])],
-             foreground=[('active', COLORS['text_light'])])
+             background=[('active', PRIMARY),
+                        ('pressed', BG_LIGHT)],
+             foreground=[('active', TEXT_LIGHT)])
     
     # Configure entry widgets
     style.configure('Modern.TEntry',
-                   fieldbackground=COLORS['bg_light'],
-                   foreground=COLORS['text_light'],
+                   fieldbackground=BG_LIGHT,
+                   foreground=TEXT_LIGHT,
                    borderwidth=1,
                    relief='solid',
-                   insertcolor=COLORS['text_light'],
-                   font=('Segoe UI', 10))
+                   insertcolor=TEXT_LIGHT,
+                   font=FONTS['base'])
     
     style.map('Modern.TEntry',
-             focuscolor=[('focus', COLORS['accent'])],
-             bordercolor=[('focus', COLORS['accent'])])
+             focuscolor=[('focus', ACCENT)],
+             bordercolor=[('focus', ACCENT)])
     
     # Configure progress bars
     style.configure('Modern.Horizontal.TProgressbar',
-                   background=COLORS['primary'],
-                   troughcolor=COLORS['bg_light'],
+                   background=PRIMARY,
+                   troughcolor=BG_LIGHT,
                    borderwidth=0,
-                   lightcolor=COLORS['primary'],
-                   darkcolor=COLORS['primary'])
+                   lightcolor=PRIMARY,
+                   darkcolor=PRIMARY)
     
     # Configure scales (sliders)
     style.configure('Modern.Horizontal.TScale',
-                   background=COLORS['bg_dark'],
-                   troughcolor=COLORS['bg_light'],
-                   slidercolor=COLORS['accent'],
+                   background=BG_DARK,
+                   troughcolor=BG_LIGHT,
+                   slidercolor=ACCENT,
                    borderwidth=0)
     
     # Configure checkbuttons
     style.configure('Modern.TCheckbutton',
-                   background=COLORS['bg_dark'],
-                   foreground=COLORS['text_light'],
-                   font=('Segoe UI', 10),
+                   background=BG_DARK,
+                   foreground=TEXT_LIGHT,
+                   font=FONTS['base'],
                    focuscolor='none')
     
     style.map('Modern.TCheckbutton',
-             background=[('active', COLORS['bg_dark'])],
-             indicatorcolor=[('selected', COLORS['accent']),
-                           ('pressed', COLORS['primary'])])
+             background=[('active', BG_DARK)],
+             indicatorcolor=[('selected', ACCENT),
+                           ('pressed', PRIMARY)])
     
     # Configure text widgets (for message areas)
     def configure_text_widget(text_widget):
         """Configure a text widget with modern styling"""
         text_widget.configure(
-            bg=COLORS['bg_light'],
-            fg=COLORS['text_light'],
-            insertbackground=COLORS['text_light'],
-            selectbackground=COLORS['primary'],
-            selectforeground=COLORS['text_light'],
-            font=('Segoe UI', 10),
+            bg=BG_LIGHT,
+            fg=TEXT_LIGHT,
+            insertbackground=TEXT_LIGHT,
+            selectbackground=PRIMARY,
+            selectforeground=TEXT_LIGHT,
+            font=FONTS['base'],
             relief='flat',
             borderwidth=1,
             highlightthickness=1,
-            highlightcolor=COLORS['accent'],
-            highlightbackground=COLORS['border']
+            highlightcolor=ACCENT,
+            highlightbackground=BORDER
         )
     
     # Make the text widget configurer globally accessible
@@ -167,3 +191,8 @@ def setup_theme(root):
 def get_color(color_name):
     """Get a color value by name"""
     return COLORS.get(color_name, '#000000')
+
+
+def get_font(font_name):
+    """Get a named font created by setup_theme (a plain description before it runs)"""
+    return FONTS.get(font_name, ('Segoe UI', 10))
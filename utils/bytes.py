@@ -2,56 +2,71 @@
 Utility functions for byte and bit manipulation
 """
 
+import hmac
 import struct
 import zlib
-from typing import List
+from typing import BinaryIO, List
+
+import numpy as np
+
+try:
+    from crc32c import crc32c as _crc32c
+    CRC32C_AVAILABLE = True
+except ImportError:
+    CRC32C_AVAILABLE = False
+
+
+# CRC-32C (Castagnoli, reflected polynomial 0x82F63B78) table for the
+# pure-Python fallback when the crc32c package is not installed
+_CRC32C_TABLE = []
+for _byte in range(256):
+    _crc = _byte
+    for _ in range(8):
+        _crc = (_crc >> 1) ^ 0x82F63B78 if _crc & 1 else _crc >> 1
+    _CRC32C_TABLE.append(_crc)
+
+
+# Bits of every byte value, MSB first, for byte-at-a-time bit expansion
+_BYTE_BITS = tuple(tuple((byte >> (7 - i)) & 1 for i in range(8)) for byte in range(256))
+
+
+# Separators hex_to_bytes strips in a single translate() pass
+_HEX_SEPARATORS = str.maketrans('', '', ' -:')
+
+
+# Units for format_byte_size, one per power of 1024
+_BYTE_UNITS = ('B', 'KB', 'MB', 'GB')
 
 
 class BitPacker:
     """Utility class for packing and unpacking bits"""
     
     @staticmethod
-    def bytes_to_bits(data: bytes) -> List[int]:
+    def bytes_to_bits(data: bytes) -> np.ndarray:
         """
-        Convert bytes to list of bits (MSB first)
+        Convert bytes to an array of bits (MSB first)
         
         Args:
             data: Byte data to convert
             
         Returns:
-            List of bits (0 or 1)
+            uint8 array of bits (0 or 1); call .tolist() for a list
         """
-        bits = []
-        for byte in data:
-            for i in range(8):
-                bit = (byte >> (7 - i)) & 1
-                bits.append(bit)
-        return bits
+        return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
         
     @staticmethod
-    def bits_to_bytes(bits: List[int]) -> bytes:
+    def bits_to_bytes(bits) -> bytes:
         """
-        Convert list of bits to bytes (MSB first)
+        Convert a sequence of bits to bytes (MSB first)
         
         Args:
-            bits: List of bits (0 or 1)
+            bits: List or array of bits (0 or 1); not modified
             
         Returns:
-            Byte data
+            Byte data, zero-padded to a whole number of bytes
         """
-        # Pad bits to multiple of 8
-        while len(bits) % 8 != 0:
-            bits.append(0)
-            
-        bytes_data = bytearray()
-        for i in range(0, len(bits), 8):
-            byte = 0
-            for j in range(8):
-                if i + j < len(bits):
-                    byte |= bits[i + j] << (7 - j)
-            bytes_data.append(byte)
-            
-        return bytes(bytes_data)
+        # packbits zero-pads a trailing partial byte itself
+        return np.packbits(np.asarray(bits, dtype=np.uint8)).tobytes()
         
     @staticmethod
     def int_to_bits(value: int, bit_count: int) -> List[int]:
@@ -65,11 +80,22 @@ class BitPacker:
         Returns:
             List of bits (MSB first)
         """
-        bits = []
-        for i in range(bit_count):
-            bit = (value >> (bit_count - 1 - i)) & 1
-            bits.append(bit)
-        return bits
+        if bit_count <= 0:
+            return []
+            
+        # Expand the big-endian bytes of the low bit_count bits
+        value &= (1 << bit_count) - 1
+        raw = value.to_bytes((bit_count + 7) // 8, 'big')
+        
+        if bit_count <= 64:
+            # A table lookup per byte instead of a shift/AND per bit
+            bits = []
+            extend = bits.extend
+            for byte in raw:
+                extend(_BYTE_BITS[byte])
+            return bits[-bit_count:]
+            
+        return np.unpackbits(np.frombuffer(raw, dtype=np.uint8))[-bit_count:].tolist()
         
     @staticmethod
     def bits_to_int(bits: List[int]) -> int:
@@ -82,10 +108,8 @@ class BitPacker:
         Returns:
             Integer value
         """
-        value = 0
-        for i, bit in enumerate(bits):
-            value |= bit << (len(bits) - 1 - i)
-        return value
+        # bits_to_bytes zero-pads at the end; shift the padding back out
+        return int.from_bytes(BitPacker.bits_to_bytes(bits), 'big') >> (-len(bits) % 8)
 
 
 def calculate_crc32(data: bytes) -> int:
@@ -98,12 +122,57 @@ def calculate_crc32(data: bytes) -> int:
     Returns:
         CRC32 value as unsigned integer
     """
-    return zlib.crc32(data) & 0xffffffff
+    # zlib.crc32 already returns an unsigned value on Python 3
+    return zlib.crc32(data)
+
+
+def calculate_crc32c(data: bytes, value: int = 0) -> int:
+    """
+    Calculate CRC-32C (Castagnoli) checksum for data
+    
+    Uses the crc32c package (SSE4.2 / ARMv8 CRC instructions) when installed,
+    otherwise a table-driven software implementation with identical output.
+    
+    Args:
+        data: Data to checksum
+        value: Running checksum of the preceding data, as with zlib.crc32
+        
+    Returns:
+        CRC-32C value as unsigned integer
+    """
+    if CRC32C_AVAILABLE:
+        return _crc32c(data, value)
+        
+    crc = value ^ 0xffffffff
+    for byte in data:
+        crc = (crc >> 8) ^ _CRC32C_TABLE[(crc ^ byte) & 0xff]
+    return crc ^ 0xffffffff
+
+
+def calculate_crc32_stream(fp: BinaryIO, chunk_size: int = 1 << 20, 
+                           castagnoli: bool = False) -> int:
+    """
+    Calculate a checksum over a file-like object without reading it whole
+    
+    Args:
+        fp: Binary file-like object, read from its current position to EOF
+        chunk_size: Bytes read per call
+        castagnoli: Compute CRC-32C (hardware accelerated with the crc32c
+                    package) instead of zlib's CRC32
+        
+    Returns:
+        Checksum value as unsigned integer
+    """
+    update = calculate_crc32c if castagnoli else zlib.crc32
+    crc = 0
+    while chunk := fp.read(chunk_size):
+        crc = update(chunk, crc)
+    return crc
 
 
 def xor_bytes(data1: bytes, data2: bytes) -> bytes:
     """
-    XOR two byte arrays
+    XOR two byte arrays of equal length
     
     Args:
         data1: First byte array
@@ -111,8 +180,16 @@ def xor_bytes(data1: bytes, data2: bytes) -> bytes:
         
     Returns:
         XORed result
+        
+    Raises:
+        ValueError: If the arrays differ in length
     """
-    return bytes(a ^ b for a, b in zip(data1, data2))
+    if len(data1) != len(data2):
+        raise ValueError(f"Cannot XOR {len(data1)} bytes with {len(data2)} bytes")
+        
+    a = np.frombuffer(data1, dtype=np.uint8)
+    b = np.frombuffer(data2, dtype=np.uint8)
+    return np.bitwise_xor(a, b).tobytes()
 
 
 def pad_bytes(data: bytes, block_size: int, padding_byte: int = 0) -> bytes:
@@ -127,13 +204,9 @@ def pad_bytes(data: bytes, block_size: int, padding_byte: int = 0) -> bytes:
     Returns:
         Padded data
     """
-    remainder = len(data) % block_size
-    if remainder == 0:
-        return data
-        
-    padding_needed = block_size - remainder
-    padding = bytes([padding_byte] * padding_needed)
-    return data + padding
+    # ljust returns data unchanged when it is already a whole number of blocks
+    target_length = len(data) + (-len(data) % block_size)
+    return data.ljust(target_length, bytes((padding_byte,)))
 
 
 def secure_compare(data1: bytes, data2: bytes) -> bool:
@@ -147,14 +220,8 @@ def secure_compare(data1: bytes, data2: bytes) -> bool:
     Returns:
         True if arrays are equal
     """
-    if len(data1) != len(data2):
-        return False
-        
-    result = 0
-    for a, b in zip(data1, data2):
-        result |= a ^ b
-        
-    return result == 0
+    # C implementation whose running time depends only on the length
+    return hmac.compare_digest(data1, data2)
 
 
 def bytes_to_hex(data: bytes, separator: str = " ") -> str:
@@ -168,7 +235,12 @@ def bytes_to_hex(data: bytes, separator: str = " ") -> str:
     Returns:
         Hexadecimal string representation
     """
-    return separator.join(f"{byte:02x}" for byte in data)
+    if len(separator) <= 1:
+        return data.hex(separator) if separator else data.hex()
+        
+    # hex() only takes single-character separators; hex digits never
+    # contain a space, so a space placeholder can be swapped out afterwards
+    return data.hex(' ').replace(' ', separator)
 
 
 def hex_to_bytes(hex_string: str) -> bytes:
@@ -182,7 +254,7 @@ def hex_to_bytes(hex_string: str) -> bytes:
         Byte data
     """
     # Remove common separators
-    hex_string = hex_string.replace(" ", "").replace("-", "").replace(":", "")
+    hex_string = hex_string.translate(_HEX_SEPARATORS)
     
     # Ensure even length
     if len(hex_string) % 2 != 0:
@@ -201,14 +273,11 @@ def format_byte_size(size_bytes: int) -> str:
     Returns:
         Formatted size string
     """
-    if size_bytes < 1024:
+    # Each unit spans 10 more bits: pick it from the bit length directly
+    unit = min((max(size_bytes, 1).bit_length() - 1) // 10, len(_BYTE_UNITS) - 1)
+    if unit == 0:
         return f"{size_bytes} B"
-    elif size_bytes < 1024**2:
-        return f"{size_bytes/1024:.1f} KB"
-    elif size_bytes < 1024**3:
-        return f"{size_bytes/(1024**2):.1f} MB"
-    else:
-        return f"{size_bytes/(1024**3):.1f} GB"
+    return f"{size_bytes / (1 << (10 * unit)):.1f} {_BYTE_UNITS[unit]}"
 
 
 def entropy(data: bytes) -> float:
@@ -225,18 +294,9 @@ def entropy(data: bytes) -> float:
         return 0.0
         
     # Count byte frequencies
-    frequency = [0] * 256
-    for byte in data:
-        frequency[byte] += 1
-        
-    # Calculate entropy
-    entropy_value = 0.0
-    data_len = len(data)
+    samples = np.frombuffer(data, dtype=np.uint8)
+    counts = np.bincount(samples, minlength=256)
     
-    import math
-    for count in frequency:
-        if count > 0:
-            probability = count / data_len
-            entropy_value -= probability * math.log2(probability)
-            
-    return entropy_value
+    # Calculate entropy over the byte values that occur
+    probability = counts[counts > 0] / samples.size
+    return float((probability * np.log2(1.0 / probability)).sum())
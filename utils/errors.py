@@ -2,6 +2,7 @@
 Custom exception classes for the Audio Steganography application
 """
 
+from functools import wraps
 from typing import Optional
 
 
@@ -12,11 +13,11 @@ class StegoError(Exception):
         super().__init__(message)
         self.message = message
         self.error_code = error_code
+        # Formatted once here; subclasses append their details in __init__
+        self._formatted = f"[{error_code}] {message}" if error_code else message
         
     def __str__(self):
-        if self.error_code:
-            return f"[{self.error_code}] {self.message}"
-        return self.message
+        return self._formatted
 
 
 class AudioError(StegoError):
@@ -40,12 +41,8 @@ class CapacityError(StegoError):
         super().__init__(message, "CAPACITY_ERROR")
         self.required = required
         self.available = available
-        
-    def __str__(self):
-        base_msg = super().__str__()
-        if self.required is not None and self.available is not None:
-            return f"{base_msg} (Required: {self.required}, Available: {self.available})"
-        return base_msg
+        if required is not None and available is not None:
+            self._formatted += f" (Required: {required}, Available: {available})"
 
 
 class ValidationError(StegoError):
@@ -54,12 +51,8 @@ class ValidationError(StegoError):
     def __init__(self, message: str, field: Optional[str] = None):
         super().__init__(message, "VALIDATION_ERROR")
         self.field = field
-        
-    def __str__(self):
-        base_msg = super().__str__()
-        if self.field:
-            return f"{base_msg} (Field: {self.field})"
-        return base_msg
+        if field:
+            self._formatted += f" (Field: {field})"
 
 
 class HeaderError(StegoError):
@@ -75,12 +68,8 @@ class FileError(StegoError):
     def __init__(self, message: str, file_path: Optional[str] = None):
         super().__init__(message, "FILE_ERROR")
         self.file_path = file_path
-        
-    def __str__(self):
-        base_msg = super().__str__()
-        if self.file_path:
-            return f"{base_msg} (File: {self.file_path})"
-        return base_msg
+        if file_path:
+            self._formatted += f" (File: {file_path})"
 
 
 class PlaybackError(StegoError):
@@ -96,12 +85,8 @@ class DependencyError(StegoError):
     def __init__(self, message: str, dependency: Optional[str] = None):
         super().__init__(message, "DEPENDENCY_ERROR")
         self.dependency = dependency
-        
-    def __str__(self):
-        base_msg = super().__str__()
-        if self.dependency:
-            return f"{base_msg} (Missing: {self.dependency})"
-        return base_msg
+        if dependency:
+            self._formatted += f" (Missing: {dependency})"
 
 
 # Error code mappings for user-friendly messages
@@ -127,8 +112,8 @@ def get_user_friendly_message(error: StegoError) -> str:
     Returns:
         User-friendly error message
     """
-    if error.error_code in ERROR_MESSAGES:
-        category = ERROR_MESSAGES[error.error_code]
+    category = ERROR_MESSAGES.get(error.error_code)
+    if category is not None:
         return f"{category}: {error.message}"
     return str(error)
 
@@ -137,27 +122,37 @@ def handle_common_errors(func):
     """
     Decorator to handle common errors and convert to user-friendly messages
     """
+    @wraps(func)
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
+        except StegoError:
+            # Already user-facing, re-raise as-is
+            raise
         except FileNotFoundError as e:
             raise FileError(f"File not found: {str(e)}")
         except PermissionError as e:
             raise FileError(f"Permission denied: {str(e)}")
-        except MemoryError as e:
+        except MemoryError:
             raise StegoError("Insufficient memory for operation")
         except KeyboardInterrupt:
             raise StegoError("Operation cancelled by user")
         except Exception as e:
-            # Re-raise StegoError instances as-is
-            if isinstance(e, StegoError):
-                raise
             # Convert other exceptions to generic StegoError
             raise StegoError(f"Unexpected error: {str(e)}")
             
     return wrapper
 
 
+# Exact exception type -> (error class, message template) for ErrorContext
+_EXIT_MAP = {
+    FileNotFoundError: (FileError, "File not found during {op}"),
+    PermissionError: (FileError, "Permission denied during {op}"),
+    MemoryError: (StegoError, "Insufficient memory for {op}"),
+    KeyboardInterrupt: (StegoError, "{op} cancelled by user"),
+}
+
+
 # Context manager for error handling
 class ErrorContext:
     """Context manager for consistent error handling"""
@@ -173,15 +168,11 @@ class ErrorContext:
             return False
             
         # Convert known exceptions to StegoError
-        if exc_type == FileNotFoundError:
-            raise FileError(f"File not found during {self.operation_name}")
-        elif exc_type == PermissionError:
-            raise FileError(f"Permission denied during {self.operation_name}")
-        elif exc_type == MemoryError:
-            raise StegoError(f"Insufficient memory for {self.operation_name}")
-        elif exc_type == KeyboardInterrupt:
-            raise StegoError(f"{self.operation_name} cancelled by user")
-        elif not isinstance(exc_val, StegoError):
+        mapped = _EXIT_MAP.get(exc_type)
+        if mapped is not None:
+            error_class, template = mapped
+            raise error_class(template.format(op=self.operation_name))
+        if not isinstance(exc_val, StegoError):
             raise StegoError(f"Error during {self.operation_name}: {str(exc_val)}")
             
         return False  # Re-raise the exception
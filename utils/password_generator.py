@@ -4,18 +4,96 @@ Password generator utility for automatic password creation
 
 import secrets
 import string
+from functools import lru_cache
 from typing import List
 
 
+SYMBOLS = "!@#$%^&*()-_=+[]{}|;:,.<>?"
+
+# Shared OS-backed generator for the one-off choice() picks
+_SYSRAND = secrets.SystemRandom()
+
+# (flag bit, characters) for each character class, in pool order
+_CHAR_CLASSES = (
+    (1, string.ascii_lowercase),
+    (2, string.ascii_uppercase),
+    (4, string.digits),
+    (8, SYMBOLS),
+)
+
+# Flag combination -> (character pool, classes that must appear). No classes
+# at all falls back to alphanumeric.
+_POOLS = {}
+for _flags in range(16):
+    _classes = tuple(chars for bit, chars in _CHAR_CLASSES if _flags & bit) or \
+               tuple(chars for bit, chars in _CHAR_CLASSES[:3])
+    _POOLS[_flags] = (''.join(_classes), _classes)
+
+# Simple word list for passphrases
+_PASSPHRASE_WORDS = (
+    "apple", "brave", "cloud", "dream", "eagle", "flame", "grace", "happy",
+    "island", "jungle", "kernel", "lemon", "magic", "noble", "ocean", "peace",
+    "quiet", "river", "storm", "tiger", "unity", "vivid", "water", "xenon",
+    "youth", "zebra", "anchor", "bridge", "castle", "dragon", "emerald", "forest",
+    "golden", "harbor", "ignite", "jasper", "knight", "lovely", "marble", "nature",
+    "onward", "purple", "quartz", "rocket", "silver", "temple", "unique", "violet",
+    "wizard", "yellow", "crimson", "diamond", "eclipse", "falcon", "glacier", "horizon"
+)
+
+# Index alphabet for _random_from
+_WORD_INDICES = bytes(range(len(_PASSPHRASE_WORDS)))
+
+# One suffix draw per word: values below 100 are the number to append
+# (a 1 in 3 chance), anything else means no number
+_SUFFIX_RANGE = 300
+
+
+@lru_cache(maxsize=None)
+def _sampling_table(alphabet: bytes):
+    """translate() table mapping a random byte onto alphabet, and the bytes to reject"""
+    threshold = 256 - 256 % len(alphabet)
+    table = bytes(alphabet[b % len(alphabet)] for b in range(256))
+    return table, bytes(range(threshold, 256))
+
+
+def _random_from(alphabet: bytes, count: int) -> bytes:
+    """
+    Draw count uniformly random items of alphabet (at most 256 entries)
+    
+    Random bytes are mapped with bytes.translate; bytes at or above the
+    largest multiple of len(alphabet) are rejected so there is no modulo bias.
+    """
+    table, reject = _sampling_table(alphabet)
+    result = b""
+    while len(result) < count:
+        result += secrets.token_bytes((count - len(result)) * 2).translate(table, reject)
+    return result[:count]
+
+
+def _random_below(bound: int, count: int) -> List[int]:
+    """
+    Draw count uniformly random integers in [0, bound) for bound <= 65536
+    
+    Values come two bytes at a time from one token_bytes buffer, with the
+    same rejection step as _random_from.
+    """
+    limit = 65536 - 65536 % bound
+    result = []
+    while len(result) < count:
+        draws = memoryview(secrets.token_bytes((count - len(result)) * 4)).cast('H')
+        result.extend(value % bound for value in draws if value < limit)
+    return result[:count]
+
+
 class PasswordGenerator:
     """Generate secure passwords automatically"""
     
-    def __init__(self):
-        self.lowercase = string.ascii_lowercase
-        self.uppercase = string.ascii_uppercase
-        self.digits = string.digits
-        self.symbols = "!@#$%^&*()-_=+[]{}|;:,.<>?"
-        
+    # Character pools, shared by every instance
+    lowercase = string.ascii_lowercase
+    uppercase = string.ascii_uppercase
+    digits = string.digits
+    symbols = SYMBOLS
+    
     def generate_password(self, length: int = 16, 
                          include_symbols: bool = True,
                          include_numbers: bool = True,
@@ -37,45 +115,28 @@ class PasswordGenerator:
         if length < 4:
             length = 4
             
-        # Build character set
-        chars = ""
-        required_chars = []
+        # Look up the prebuilt character set for this combination
+        flags = (bool(include_lowercase) | bool(include_uppercase) << 1 |
+                 bool(include_numbers) << 2 | bool(include_symbols) << 3)
+        chars, classes = _POOLS[flags]
+        
+        # One character from each selected class
+        choice = _SYSRAND.choice
+        required_chars = [choice(class_chars) for class_chars in classes]
         
-        if include_lowercase:
-            chars += self.lowercase
-            required_chars.append(secrets.choice(self.lowercase))
-            
-        if include_uppercase:
-            chars += self.uppercase
-            required_chars.append(secrets.choice(self.uppercase))
-            
-        if include_numbers:
-            chars += self.digits
-            required_chars.append(secrets.choice(self.digits))
-            
-        if include_symbols:
-            chars += self.symbols
-            required_chars.append(secrets.choice(self.symbols))
-            
-        if not chars:
-            # Fallback to alphanumeric
-            chars = self.lowercase + self.uppercase + self.digits
-            required_chars = [
-                secrets.choice(self.lowercase),
-                secrets.choice(self.uppercase),
-                secrets.choice(self.digits)
-            ]
-            
         # Generate remaining characters
         remaining_length = length - len(required_chars)
         if remaining_length > 0:
-            random_chars = [secrets.choice(chars) for _ in range(remaining_length)]
+            random_chars = list(_random_from(chars.encode('ascii'), remaining_length).decode('ascii'))
         else:
             random_chars = []
             
-        # Combine and shuffle
-        password_chars = required_chars + random_chars
-        secrets.SystemRandom().shuffle(password_chars)
+        # Drop each required character in at a random position. The filler
+        # characters are already independent and uniform, so this gives the
+        # same distribution as shuffling the whole list.
+        password_chars = random_chars
+        for char in required_chars:
+            password_chars.insert(secrets.randbelow(len(password_chars) + 1), char)
         
         return ''.join(password_chars[:length])
         
@@ -91,25 +152,15 @@ class PasswordGenerator:
         Returns:
             Generated passphrase
         """
-        # Simple word list for passphrases
-        words = [
-            "apple", "brave", "cloud", "dream", "eagle", "flame", "grace", "happy",
-            "island", "jungle", "kernel", "lemon", "magic", "noble", "ocean", "peace",
-            "quiet", "river", "storm", "tiger", "unity", "vivid", "water", "xenon",
-            "youth", "zebra", "anchor", "bridge", "castle", "dragon", "emerald", "forest",
-            "golden", "harbor", "ignite", "jasper", "knight", "lovely", "marble", "nature",
-            "onward", "purple", "quartz", "rocket", "silver", "temple", "unique", "violet",
-            "wizard", "yellow", "crimson", "diamond", "eclipse", "falcon", "glacier", "horizon"
-        ]
-        
-        selected_words = [secrets.choice(words) for _ in range(word_count)]
-        
-        # Add random numbers to some words
-        for i in range(len(selected_words)):
-            if secrets.randbelow(3) == 0:  # 33% chance
-                selected_words[i] += str(secrets.randbelow(100))
-                
-        return separator.join(selected_words)
+        indices = _random_from(_WORD_INDICES, word_count)
+        
+        # Add random numbers to some words (33% chance each)
+        suffixes = _random_below(_SUFFIX_RANGE, word_count)
+        
+        return separator.join([
+            _PASSPHRASE_WORDS[i] + str(suffix) if suffix < 100 else _PASSPHRASE_WORDS[i]
+            for i, suffix in zip(indices, suffixes)
+        ])
         
     def generate_memorable_password(self, length: int = 12) -> str:
         """
@@ -125,20 +176,20 @@ class PasswordGenerator:
         min_length = max(8, length)
         
         words = ["Sun", "Sky", "Fox", "Cat", "Dog", "Car", "Sea", "Moon", "Star", "Fire"]
-        word1 = secrets.choice(words)
-        word2 = secrets.choice(words)
+        word1 = _SYSRAND.choice(words)
+        word2 = _SYSRAND.choice(words)
         
         numbers = str(secrets.randbelow(9999)).zfill(2)
-        symbols = secrets.choice("!@#$%&*")
+        symbols = _SYSRAND.choice("!@#$%&*")
         
         base_password = word1 + numbers + symbols + word2
         
         # Pad or trim to desired length
         if len(base_password) < min_length:
             # Add more characters
-            extra_chars = self.lowercase + self.digits
-            while len(base_password) < min_length:
-                base_password += secrets.choice(extra_chars)
+            extra_chars = (self.lowercase + self.digits).encode('ascii')
+            pad = _random_from(extra_chars, min_length - len(base_password))
+            base_password += pad.decode('ascii')
         elif len(base_password) > length:
             # Trim to length
             base_password = base_password[:length]
@@ -3,8 +3,8 @@ Custom modern widgets for the Audio Steganography application
 """
 
 import tkinter as tk
-from tkinter import ttk
-from theme import get_color
+from tkinter import filedialog, ttk
+from theme import get_font, ACCENT, BG_LIGHT, BORDER, PRIMARY, TEXT_LIGHT
 
 
 class ModernFrame(ttk.Frame):
@@ -47,23 +47,24 @@ class ModernProgressBar(ttk.Progressbar):
 class ModernText(tk.Text):
     """Modern styled text widget"""
     
+    # Modern styling, passed at creation instead of a second configure call
+    _STYLE_OPTIONS = dict(
+        bg=BG_LIGHT,
+        fg=TEXT_LIGHT,
+        insertbackground=TEXT_LIGHT,
+        selectbackground=PRIMARY,
+        selectforeground=TEXT_LIGHT,
+        relief='flat',
+        borderwidth=1,
+        highlightthickness=1,
+        highlightcolor=ACCENT,
+        highlightbackground=BORDER,
+        wrap=tk.WORD
+    )
+    
     def __init__(self, parent, **kwargs):
+        kwargs.update(self._STYLE_OPTIONS, font=get_font('base'))
         super().__init__(parent, **kwargs)
-        # Apply modern styling
-        self.configure(
-            bg=get_color('bg_light'),
-            fg=get_color('text_light'),
-            insertbackground=get_color('text_light'),
-            selectbackground=get_color('primary'),
-            selectforeground=get_color('text_light'),
-            font=('Segoe UI', 10),
-            relief='flat',
-            borderwidth=1,
-            highlightthickness=1,
-            highlightcolor=get_color('accent'),
-            highlightbackground=get_color('border'),
-            wrap=tk.WORD
-        )
 
 
 class ModernScale(ttk.Scale):
@@ -84,8 +85,8 @@ class CardFrame(ModernFrame):
     """Card-style frame with background"""
     
     def __init__(self, parent, **kwargs):
+        kwargs.setdefault('padding', 15)
         super().__init__(parent, style='Card.TFrame', **kwargs)
-        self.configure(padding=15)
 
 
 class PasswordEntry(ModernFrame):
@@ -100,7 +101,7 @@ class PasswordEntry(ModernFrame):
         self.entry.grid(row=0, column=0, sticky="ew", padx=(0, 5))
         
         # Create show/hide button
-        self.show_var = tk.BooleanVar()
+        self._shown = False
         self.toggle_btn = ModernButton(self, text="👁", command=self.toggle_visibility)
         self.toggle_btn.grid(row=0, column=1)
         
@@ -109,13 +110,9 @@ class PasswordEntry(ModernFrame):
         
     def toggle_visibility(self):
         """Toggle password visibility"""
-        if self.show_var.get():
-            self.entry.configure(show='')
-            self.toggle_btn.configure(text="🙈")
-        else:
-            self.entry.configure(show='*')
-            self.toggle_btn.configure(text="👁")
-        self.show_var.set(not self.show_var.get())
+        self._shown = not self._shown
+        self.entry.configure(show='' if self._shown else '*')
+        self.toggle_btn.configure(text="🙈" if self._shown else "👁")
         
     def get(self):
         """Get the entry value"""
@@ -158,7 +155,6 @@ class FileSelector(ModernFrame):
         
     def browse_file(self):
         """Open file dialog to select file"""
-        from tkinter import filedialog
         filename = filedialog.askopenfilename(
             title=self.title,
             filetypes=self.filetypes